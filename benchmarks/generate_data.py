@@ -0,0 +1,118 @@
+import argparse
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+# --- Synthetic bingads_* / users data for the benchmarks ---
+# Writes the local mirror layout (see utils/mirror.py): one Parquet file per day for each report
+# table, one file per dimension table, plus a config.toml that points the dashboard at it.
+#   python -m benchmarks.generate_data --scale 1m
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DATA_DIR = os.path.join("benchmarks", "data")
+
+
+def _write(root, table, name, df):
+    directory = os.path.join(root, table)
+    os.makedirs(directory, exist_ok=True)
+    df.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False)
+
+
+def _money(rng, size, mean):
+    return np.round(rng.gamma(2.0, mean / 2.0, size), 2)
+
+
+def generate(scale, days=90, seed=0, today=None):
+    rows = SCALES[scale]
+    today = today or date.today()
+    rng = np.random.default_rng(seed)
+    root = os.path.abspath(os.path.join(DATA_DIR, scale))
+
+    # Campaign report: one row per campaign per day, so `rows` spread over `days` sets the campaign count
+    per_day = max(rows // days, 1)
+    n_campaigns = per_day
+    n_accounts = max(n_campaigns // 200, 5)
+    n_users = max(n_campaigns // 100, 10)
+    n_domains = max(per_day // 4, 500)
+
+    campaign_ids = np.arange(1, n_campaigns + 1)
+    campaign_names = np.array([f"campaign-{i:07d}" for i in campaign_ids])
+    campaign_accounts = rng.integers(1, n_accounts + 1, n_campaigns)
+    domains = np.array([f"site{i}.example.com" for i in range(n_domains)])
+    # A minority of domains convert badly, so the bad publisher scoring has something to find
+    domain_quality = np.where(rng.random(n_domains) < 0.15, rng.uniform(0.2, 0.7, n_domains), rng.uniform(0.9, 1.5, n_domains))
+    campaign_quality = rng.uniform(0.8, 1.3, n_campaigns)
+
+    _write(root, "bingads_account_master", "full", pd.DataFrame({
+        "account_id": np.arange(1, n_accounts + 1),
+        "account_name": [f"Account {i:04d}" for i in range(1, n_accounts + 1)],
+    }))
+    _write(root, "users", "full", pd.DataFrame({
+        "id": np.arange(1, n_users + 1),
+        "name": [f"user{i:04d}" for i in range(1, n_users + 1)],
+    }))
+    # Each campaign is shared with one to three users
+    shares = rng.integers(1, 4, n_campaigns)
+    _write(root, "bingads_user_campaign_permission_relation_master", "full", pd.DataFrame({
+        "campaign_id": np.repeat(campaign_ids, shares),
+        "user_id": rng.integers(1, n_users + 1, shares.sum()),
+    }).drop_duplicates())
+
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+
+        impressions = rng.poisson(800, n_campaigns)
+        bing_clicks = rng.binomial(impressions, 0.03)
+        spend = _money(rng, n_campaigns, 40.0)
+        _write(root, "bingads_optimizer_afs_campaign_performance_report", day.isoformat(), pd.DataFrame({
+            "api_data_date": day,
+            "bing_account_id": campaign_accounts,
+            "bing_campaign_id": campaign_ids,
+            "bing_campaign_name": campaign_names,
+            "bing_impressions": impressions,
+            "bing_clicks": bing_clicks,
+            "pbt_adclick_count": rng.binomial(bing_clicks, 0.6),
+            "bing_spend": spend,
+            "tcl_revenue": np.round(spend * campaign_quality * rng.lognormal(0.0, 0.3, n_campaigns), 2),
+            "afs_estimated_earnings": np.round(spend * campaign_quality * rng.lognormal(-0.05, 0.3, n_campaigns), 2),
+        }))
+
+        # Publisher report: the same row count, spread over campaigns x ad groups x domains (Zipf-like reach)
+        campaign = rng.integers(0, n_campaigns, per_day)
+        domain = np.minimum(rng.zipf(1.3, per_day) - 1, n_domains - 1)
+        impressions = rng.poisson(60, per_day)
+        clicks = rng.binomial(impressions, 0.02)
+        spend = _money(rng, per_day, 3.0)
+        blocked = rng.random(per_day) < 0.02
+        _write(root, "bingads_optimizer_afs_pub_report", day.isoformat(), pd.DataFrame({
+            "api_data_date": day,
+            "account_id": campaign_accounts[campaign],
+            "campaign_id": campaign_ids[campaign],
+            "campaign_name": campaign_names[campaign],
+            "ad_group_name": [f"ad-group-{k}" for k in rng.integers(1, 6, per_day)],
+            "final_main_domain": domains[domain],
+            "blocked_at_ad_group": blocked.astype(int),
+            "blocked_at_campaign": 0,
+            "bing_impression": impressions,
+            "pbt_adclick_count": clicks,
+            "bing_spend": spend,
+            "tcl_revenue": np.round(spend * domain_quality[domain] * rng.lognormal(0.0, 0.4, per_day), 2),
+        }))
+
+    config_path = os.path.join(root, "config.toml")
+    with open(config_path, "w") as f:
+        f.write(
+            "[database]\nuser = \"\"\npassword = \"\"\nhost = \"\"\ndatabase = \"\"\n\n"
+            f"[mirror]\nenabled = true\npath = \"{root.replace(os.sep, '/')}\"\n"
+        )
+    return root
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic mirror for the benchmarks")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.scale, args.days, args.seed))
@@ -0,0 +1,201 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# --- Benchmark harness ---
+# Times every queries/ function and the components/ renderers against a generated mirror
+# (benchmarks/generate_data.py), with all caches cleared before each run so every timing is cold.
+#   python -m benchmarks.run --scale 1m                  # compare with the saved baseline
+#   python -m benchmarks.run --scale 1m --save-baseline  # record a new baseline
+# Peak memory is Python-side allocations (pandas/NumPy included); DuckDB's own buffers are not counted.
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def _configure(scale):
+    config = os.path.abspath(os.path.join("benchmarks", "data", scale, "config.toml"))
+    if not os.path.exists(config):
+        sys.exit(f"No data for scale {scale}; run `python -m benchmarks.generate_data --scale {scale}` first")
+    # Must be set before the dashboard modules read their config
+    os.environ["DASHBOARD_CONFIG"] = config
+    # Streamlit warns about the missing script runtime on every cached call
+    logging.disable(logging.WARNING)
+
+
+def _cases(start, end):
+    from queries.accounts import get_bing_accounts
+    from queries.user import fetch_user_mapping
+    from queries.campaign_names import fetch_campaign_names
+    from queries.base_data import fetch_base_data, derive_trend_series
+    from queries.campaign_stats import fetch_data
+    from queries.daily_stats import fetch_aggregated_daily_data
+    from queries.chart_data import fetch_overall_trend_data
+    from queries.kpi_totals import fetch_period_totals
+    from queries.publishers_stats import fetch_publisher_report, fetch_filtered_publisher_report, fetch_publisher_summary, fetch_publisher_page
+    from queries.bad_publishers import bad_publishers_report
+    from components.kpis import render_kpi_block
+    from queries.dashboard import previous_period
+    from components.charts import render_line_chart
+    from components.tabs import render_data_tabs
+    from utils.selection import Selection
+
+    everything = (Selection.all(), Selection.all(), Selection.all())
+    users = list(fetch_user_mapping().values())
+    one_user = (Selection(users[:1]), Selection.all(), Selection.all())
+    prev_start, prev_end = previous_period(start, end)
+
+    # Inputs for the renderers are fetched once up front; only the render itself is timed
+    campaigns = fetch_data(start, end, *everything)
+    daily = fetch_aggregated_daily_data(start, end, *everything)
+    publishers = fetch_publisher_report(start, end, *everything)
+    trend = derive_trend_series(campaigns)
+    totals = fetch_period_totals(start, end, prev_start, prev_end, *everything)
+
+    return {
+        "queries.accounts.get_bing_accounts": (get_bing_accounts, ()),
+        "queries.user.fetch_user_mapping": (fetch_user_mapping, ()),
+        "queries.campaign_names.fetch_campaign_names": (fetch_campaign_names, (start, end)),
+        "queries.base_data.fetch_base_data": (fetch_base_data, (start, end, *everything)),
+        "queries.campaign_stats.fetch_data": (fetch_data, (start, end, *everything)),
+        "queries.campaign_stats.fetch_data[user]": (fetch_data, (start, end, *one_user)),
+        "queries.daily_stats.fetch_aggregated_daily_data": (fetch_aggregated_daily_data, (start, end, *everything)),
+        "queries.chart_data.fetch_overall_trend_data": (fetch_overall_trend_data, (start, end)),
+        "queries.kpi_totals.fetch_period_totals": (fetch_period_totals, (start, end, prev_start, prev_end, *everything)),
+        "queries.publishers_stats.fetch_publisher_report": (fetch_publisher_report, (start, end, *everything)),
+        "queries.publishers_stats.fetch_filtered_publisher_report": (
+            fetch_filtered_publisher_report, (start, end, *everything, (("Spend", ">", 5.0), ("ROI", "<", -20.0)))
+        ),
+        "queries.publishers_stats.fetch_publisher_summary": (fetch_publisher_summary, (start, end, *everything)),
+        "queries.publishers_stats.fetch_publisher_page": (fetch_publisher_page, (start, end, *everything)),
+        "queries.bad_publishers.bad_publishers_report": (bad_publishers_report, (start, end, *everything)),
+        "components.kpis.render_kpi_block": (render_kpi_block, (campaigns, start, end, *everything, totals)),
+        "components.charts.render_line_chart": (render_line_chart, (trend, " (Overall Performance)")),
+        "components.tabs.render_data_tabs": (render_data_tabs, (daily, campaigns, publishers, start, end, *everything)),
+    }
+
+
+def _clear_caches():
+    from utils.db import clear_query_cache
+    clear_query_cache()
+
+
+def _rows(result):
+    if hasattr(result, "__len__") and not isinstance(result, (str, dict)):
+        return len(result)
+    return 1
+
+
+def _measure(fn, args, repeat):
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        _clear_caches()
+        started = time.perf_counter()
+        rows = _rows(fn(*args))
+        timings.append(time.perf_counter() - started)
+
+    # tracemalloc slows allocation-heavy code down, so peak memory comes from one extra, untimed run
+    _clear_caches()
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "seconds": statistics.median(timings),
+        "min_seconds": min(timings),
+        "peak_mb": round(peak / 2 ** 20, 2),
+        "rows": rows,
+    }
+
+
+def _scanned_rows(start, end):
+    # Report-table rows in the benchmarked window, the denominator of the throughput figures
+    import sqlalchemy
+    from utils.mirror import get_mirror_engine
+    counts = {}
+    with get_mirror_engine().connect() as conn:
+        for table in ["bingads_optimizer_afs_campaign_performance_report", "bingads_optimizer_afs_pub_report"]:
+            counts[table] = conn.execute(
+                sqlalchemy.text(f"SELECT COUNT(*) FROM {table} WHERE api_data_date BETWEEN :start_date AND :end_date"),
+                {"start_date": start, "end_date": end},
+            ).scalar()
+    return counts
+
+
+def _compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        ratio = current["seconds"] / previous["seconds"] if previous["seconds"] else 1.0
+        current["vs_baseline"] = round(ratio, 2)
+        if ratio > threshold:
+            regressions.append(f"{name}: {previous['seconds']:.3f}s -> {current['seconds']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's queries and renderers")
+    parser.add_argument("--scale", default="10k")
+    parser.add_argument("--days", type=int, default=30, help="width of the benchmarked date range")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    _configure(args.scale)
+    end = date.today()
+    start = end - timedelta(days=args.days - 1)
+    scanned = _scanned_rows(start, end)
+
+    results = {}
+    for name, (fn, fn_args) in _cases(start, end).items():
+        if args.only not in name:
+            continue
+        result = _measure(fn, fn_args, args.repeat)
+        source = "bingads_optimizer_afs_pub_report" if "publisher" in name else "bingads_optimizer_afs_campaign_performance_report"
+        result["rows_per_s"] = round(scanned[source] / result["seconds"]) if result["seconds"] else None
+        result["seconds"] = round(result["seconds"], 4)
+        result["min_seconds"] = round(result["min_seconds"], 4)
+        results[name] = result
+        print(f"{name:60} {result['seconds']:9.4f}s {result['peak_mb']:9.2f} MB {result['rows']:>9} rows")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    baseline_path = os.path.join(RESULTS_DIR, f"baseline_{args.scale}.json")
+    regressions = []
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path) as f:
+            regressions = _compare(results, json.load(f)["results"], args.threshold)
+
+    report = {
+        "scale": args.scale,
+        "days": args.days,
+        "repeat": args.repeat,
+        "scanned_rows": scanned,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    target = baseline_path if args.save_baseline else os.path.join(RESULTS_DIR, f"latest_{args.scale}.json")
+    with open(target, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Wrote {target}")
+
+    if regressions:
+        print("Slower than baseline:")
+        print("\n".join(f"  {line}" for line in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,52 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+from queries.accounts import get_bing_accounts
+from queries.chart_data import fetch_account_trend_data
+from utils.config import get_setting
+from utils.downsample import downsample_frame
+from utils.metrics import timed_render
 
+BREAKDOWN_METRICS = ['Spend', 'TCL', 'AFS', 'Clicks', 'Impr']
+
+# --- Chart engine: WebGL traces, downsampled to a point budget per series ---
+# Plotly's zoom doesn't reach Python in Streamlit, so long series get a zoom slider instead: the
+# selected window is downsampled again, and shows every point once it fits the budget.
+
+
+def _point_budget():
+    return get_setting("dashboard", "chart_points", 1000)
+
+
+def _zoom(df, key):
+    # Narrows df to the window picked on a slider, shown only when the series exceed the budget
+    days = df['Date'].drop_duplicates()
+    if len(df) <= _point_budget() or len(days) < 3:
+        return df
+    first, last = days.min().date(), days.max().date()
+    low, high = st.slider("🔍 Zoom", min_value=first, max_value=last, value=(first, last), key=key, format="YYYY-MM-DD")
+    return df[(df['Date'] >= pd.Timestamp(low)) & (df['Date'] <= pd.Timestamp(high))]
+
+
+@timed_render
 def render_line_chart(df_for_charts: pd.DataFrame, chart_title_suffix: str):
     st.markdown("### :chart_with_upwards_trend: Trends")
 
     if not df_for_charts.empty:
+        df_for_charts = df_for_charts.assign(Date=pd.to_datetime(df_for_charts['Date'])).sort_values('Date')
+        df_for_charts = downsample_frame(_zoom(df_for_charts, "trend_zoom"), 'Date', ['Spend', 'TCL'], _point_budget())
+
         fig = make_subplots(specs=[[{"secondary_y": True}]])
 
         fig.add_trace(
-            go.Scatter(x=df_for_charts['Date'], y=df_for_charts['Spend'],
-                       name="💸 Spend", line=dict(color="darkorange")),
+            go.Scattergl(x=df_for_charts['Date'], y=df_for_charts['Spend'],
+                         name="💸 Spend", line=dict(color="darkorange")),
             secondary_y=False,
         )
 
         fig.add_trace(
-            go.Scatter(x=df_for_charts['Date'], y=df_for_charts['TCL'],
-                       name="📈 TCL Revenue", line=dict(color="royalblue")),
+            go.Scattergl(x=df_for_charts['Date'], y=df_for_charts['TCL'],
+                         name="📈 TCL Revenue", line=dict(color="royalblue")),
             secondary_y=True,
         )
 
@@ -38,3 +68,52 @@ def render_line_chart(df_for_charts: pd.DataFrame, chart_title_suffix: str):
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.info("No data available to display trends based on the current selection.")
+
+
+@timed_render
+def render_breakdown_chart(df_campaign, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection):
+    # One line per campaign or account, limited to the largest series by the chosen metric
+    if not st.toggle("Show breakdown by campaign / account", key="chart_breakdown_on"):
+        return
+
+    col1, col2 = st.columns(2)
+    by = col1.radio("Breakdown", ['Campaign', 'Account'], horizontal=True, key="chart_breakdown_by")
+    metric = col2.selectbox("Metric", BREAKDOWN_METRICS, key="chart_breakdown_metric")
+
+    if by == 'Account':
+        df = fetch_account_trend_data(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
+        if not df.empty:
+            account_names = {account_id: name for name, account_id in get_bing_accounts().items()}
+            df = df.assign(Account=df['Account'].map(account_names).fillna(df['Account'].astype(str)))
+    else:
+        df = df_campaign
+
+    if df.empty:
+        st.info("No data available for the breakdown.")
+        return
+
+    max_series = get_setting("dashboard", "chart_max_series", 20)
+    totals = df.groupby(by, observed=True)[metric].sum().sort_values(ascending=False)
+    top = totals.index[:max_series]
+    if len(totals) > max_series:
+        st.caption(f"Showing the top {max_series} of {len(totals)} by {metric}.")
+
+    df = df[df[by].isin(top)].assign(Date=lambda d: pd.to_datetime(d['Date'])).sort_values('Date')
+    df = _zoom(df, "breakdown_zoom")
+    # The budget is shared, so the payload stays bounded however many series are drawn
+    per_series = max(_point_budget() // len(top), 50)
+
+    fig = go.Figure()
+    for name in top:
+        series = downsample_frame(df[df[by] == name], 'Date', [metric], per_series)
+        fig.add_trace(go.Scattergl(x=series['Date'], y=series[metric], name=str(name), mode='lines'))
+
+    fig.update_layout(
+        title=f"📊 {metric} by {by}",
+        template="plotly_white",
+        height=470,
+        xaxis=dict(title='Date'),
+        yaxis=dict(title=metric),
+        legend=dict(orientation="v"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,53 @@
+import time
+import pandas as pd
+import streamlit as st
+from utils.config import get_setting
+from utils.metrics import metrics_enabled, rerun_events, write_prometheus_file
+from utils.cache import get_result_cache
+from utils.warmup import warmup_enabled, get_warmup_scheduler
+
+# --- Optional sidebar panel with this rerun's query and render timings ---
+
+def render_debug_panel():
+    if not metrics_enabled():
+        return
+    # Drawn last, so every query and render of the rerun has been recorded
+    write_prometheus_file()
+    if not get_setting("metrics", "panel", True):
+        return
+
+    events = pd.DataFrame(rerun_events())
+    with st.sidebar.expander("**🛠️ Debug: this rerun**", expanded=False):
+        if events.empty:
+            st.caption("Nothing recorded yet.")
+            return
+
+        queries = events[events['kind'] == 'query']
+        renders = events[events['kind'] == 'render']
+        lookups = events[events['kind'].isin(['cache', 'partitions'])]
+        col1, col2 = st.columns(2)
+        col1.metric("Queries", len(queries))
+        col2.metric("SQL time", f"{queries['seconds'].sum():.2f}s" if not queries.empty else "0s")
+        hits = int((lookups['cache'] == 'hit').sum()) if 'cache' in lookups else 0
+        col1.metric("Cache hits", f"{hits}/{len(lookups)}")
+        col2.metric("Render time", f"{renders['seconds'].sum():.2f}s" if not renders.empty else "0s")
+        cache = get_result_cache().stats()
+        st.caption(f"Result cache: {cache['entries']} entries, {cache['bytes'] / 2 ** 20:.1f} of {cache['max_bytes'] / 2 ** 20:.0f} MB")
+        if "shared" in cache:
+            shared = cache["shared"]
+            st.caption(f"Shared cache: {shared['entries']} files, {shared['bytes'] / 2 ** 20:.1f} of {shared['max_bytes'] / 2 ** 20:.0f} MB")
+        if warmup_enabled():
+            last = get_warmup_scheduler().last_warmup
+            if last is not None:
+                st.caption(f"Last warm-up: {time.strftime('%H:%M:%S', time.localtime(last['at']))}, {last['selections']} selection(s) in {last['seconds']:.1f}s")
+
+        columns = [col for col in ['kind', 'name', 'seconds', 'cache', 'rows', 'memory_bytes', 'mode', 'cells', 'hit_days', 'missed_days', 'coalesced'] if col in events]
+        st.dataframe(
+            events[columns].sort_values('seconds', ascending=False),
+            column_config={
+                'seconds': st.column_config.NumberColumn(format="%.3f"),
+                'memory_bytes': st.column_config.NumberColumn("memory (bytes)", format="%d"),
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
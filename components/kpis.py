@@ -1,26 +1,32 @@
 import streamlit as st
 import pandas as pd
-from datetime import timedelta
-from queries.campaign_stats import fetch_data
+from queries.kpi_totals import TOTAL_COLUMNS, fetch_period_totals
+from queries.dashboard import previous_period
+from utils.metrics import timed_render
 
 
-def render_kpi_block(df_table, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection):
+@timed_render
+def render_kpi_block(df_table, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, totals=None):
     st.subheader("🔢 Key Performance Indicators")
     col1, col2, col3, col4 = st.columns(4)
 
-    total_spend = df_table['Spend'].sum()
-    total_tcl = df_table['TCL'].sum()
+    # Current and previous period totals (main.py prefetches them alongside the other queries)
+    if totals is None:
+        prev_start_date, prev_end_date = previous_period(start_date, end_date)
+        totals = fetch_period_totals(start_date, end_date, prev_start_date, prev_end_date, user_id_selection, campaign_name_selection, account_id_selection)
+    if totals is None:
+        # The query failed (its error is already shown); zeros for this rerun only, nothing is cached
+        totals = dict.fromkeys(TOTAL_COLUMNS, 0.0), dict.fromkeys(TOTAL_COLUMNS, 0.0)
+    current_totals, prev_totals = totals
+
+    total_spend = current_totals['Spend']
+    total_tcl = current_totals['TCL']
     total_profit_tcl = total_tcl - total_spend
     roi_tcl = (total_profit_tcl / total_spend * 100) if total_spend != 0 else 0
 
     # Previous Period
-    period_length = (end_date - start_date).days + 1
-    prev_end_date = start_date - timedelta(days=1)
-    prev_start_date = prev_end_date - timedelta(days=period_length - 1)
-    prev_df = fetch_data(prev_start_date, prev_end_date, user_id_selection, campaign_name_selection, account_id_selection)
-
-    prev_spend = prev_df['Spend'].sum() if not prev_df.empty else 0
-    prev_tcl = prev_df['TCL'].sum() if not prev_df.empty else 0
+    prev_spend = prev_totals['Spend']
+    prev_tcl = prev_totals['TCL']
     prev_profit_tcl = prev_tcl - prev_spend
     prev_roi_tcl = (prev_profit_tcl / prev_spend * 100) if prev_spend != 0 else 0
 
@@ -1,9 +1,14 @@
 import streamlit as st
-from datetime import date, timedelta
+from datetime import date
 from queries.accounts import get_bing_accounts
 from queries.user import fetch_user_mapping
-from queries.campaign_names import fetch_campaign_names
+from queries.campaign_dimension import get_campaign_dimension
+from queries.dashboard import QUICK_RANGES, quick_range
+from utils.config import get_setting
+from utils.selection import Selection
+from utils.metrics import timed_render
 
+@timed_render
 def render_sidebar_filters():
     st.sidebar.title("Welcome! This is the Dashboard of Bing Reports")
     st.sidebar.markdown('Play around with the filters for more details.')
@@ -14,20 +19,12 @@ def render_sidebar_filters():
     with st.sidebar.expander("**Quick Date Filters**", expanded=False):
         date_range_option = st.radio(
             'Select a period',
-            ["Last 7 Days", "Last 15 Days", "Last 30 Days", "Last 60 Days", "Last 90 Days"],
+            list(QUICK_RANGES),
             label_visibility='collapsed',
             index=2)
 
-        num_days_map = {
-            "Last 7 Days": 7,
-            "Last 15 Days": 15,
-            "Last 30 Days": 30,
-            "Last 60 Days": 60,
-            "Last 90 Days": 90}
-
-        days_offset = num_days_map.get(date_range_option, 30)
-        quick_filter_start_date = today - timedelta(days=days_offset) + timedelta(days=1)
-        quick_filter_end_date = today
+        days_offset = QUICK_RANGES.get(date_range_option, 30)
+        quick_filter_start_date, quick_filter_end_date = quick_range(days_offset, today)
 
     # --- MANUAL DATE INPUT ---
     with st.sidebar.expander('**Custom Date Range**', expanded=False):
@@ -73,7 +70,11 @@ def render_sidebar_filters():
 
         st.session_state.accounts_selection_all_checked = select_all_accounts
 
-    account_id_selection = [account_options[name] for name in account_selection]
+    # "Select All" is passed on as a sentinel so the queries can drop the account predicate altogether
+    if select_all_accounts:
+        account_id_selection = Selection.all()
+    else:
+        account_id_selection = Selection(account_options[name] for name in account_selection)
 
     
 
@@ -97,31 +98,46 @@ def render_sidebar_filters():
         st.session_state.current_user_names = selected_user_names
         st.session_state.user_selection_all_checked = select_all_users
 
-    user_id_selection = [user_mapping[name] for name in selected_user_names]
+    if select_all_users:
+        user_id_selection = Selection.all()
+    else:
+        user_id_selection = Selection(user_mapping[name] for name in selected_user_names)
 
     # --- CAMPAIGN FILTER ---
-    campaign_options = fetch_campaign_names(start_date, end_date, user_id_selection if user_id_selection else None)
+    # Options come from the in-memory campaign dimension: scoped to the dates, users and accounts,
+    # and narrowed by the search box, so the multiselect only ever holds a page of names
+    dimension = get_campaign_dimension()
+    in_scope = dimension.scope(start_date, end_date, user_id_selection, account_id_selection)
+    option_limit = get_setting("dashboard", "campaign_option_limit", 200)
 
     with st.sidebar.expander('**Campaign Selection**', expanded=False):
         if 'campaign_selection_all_checked' not in st.session_state:
             st.session_state.campaign_selection_all_checked = True
         if 'current_campaign_names' not in st.session_state:
-            st.session_state.current_campaign_names = campaign_options
+            st.session_state.current_campaign_names = []
 
         select_all_campaigns = st.checkbox("Select All Campaigns", value=st.session_state.campaign_selection_all_checked, key='select_all_campaigns_checkbox')
 
         if select_all_campaigns:
-            campaign_name_selection = campaign_options
-            st.session_state.current_campaign_names = campaign_options
+            campaign_name_selection = []
+            st.session_state.current_campaign_names = []
         else:
+            search = st.text_input("Search Campaigns", key='campaign_search', placeholder="Type part of a name")
+            matches = dimension.search(search, in_scope, limit=option_limit)
+            # Chosen names stay available whatever the search shows
+            chosen = st.session_state.current_campaign_names
+            campaign_options = chosen + [name for name in matches if name not in chosen]
+            if len(matches) == option_limit:
+                st.caption(f"Showing the first {option_limit} matches, type to narrow them down.")
             campaign_name_selection = st.multiselect(
                 "Select Campaign Names",
                 campaign_options,
-                default=st.session_state.current_campaign_names,
+                default=chosen,
                 key='campaign_name_multiselect')
             st.session_state.current_campaign_names = campaign_name_selection
 
         st.session_state.campaign_selection_all_checked = select_all_campaigns
 
+    campaign_name_selection = Selection.all() if select_all_campaigns else Selection(campaign_name_selection)
     
     return start_date, end_date, account_id_selection, user_id_selection, campaign_name_selection
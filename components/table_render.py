@@ -0,0 +1,51 @@
+import streamlit as st
+from utils.config import get_setting
+from utils.metrics import timed
+
+# --- Table rendering: pandas Styler for small tables, native column config for large ones ---
+# Styler runs its colour/format callbacks per cell in Python and has a hard cell limit, so past
+# `styled_cell_limit` cells the same table is rendered with Streamlit's column types instead.
+
+
+def native_column_config(df, counts=(), money=(), signed_money=(), percents=(), bars=()):
+    # An explicit sign stands in for the green/red colouring of the styled tables
+    formats = {}
+    formats.update({col: '%d' for col in counts})
+    formats.update({col: '$%.2f' for col in money})
+    formats.update({col: '$%+.2f' for col in signed_money})
+    formats.update({col: '%+.2f%%' for col in percents})
+
+    config = {}
+    if 'Date' in df.columns:
+        config['Date'] = st.column_config.DateColumn('Date', format='YYYY-MM-DD')
+    for col, number_format in formats.items():
+        if col not in df.columns:
+            continue
+        if col in bars:
+            values = df[col].dropna()
+            low = min(float(values.min()), 0.0) if not values.empty else 0.0
+            high = max(float(values.max()), 0.0) if not values.empty else 0.0
+            config[col] = st.column_config.ProgressColumn(col, format=number_format, min_value=low, max_value=high if high > low else low + 1)
+        else:
+            config[col] = st.column_config.NumberColumn(col, format=number_format)
+    return config
+
+
+def use_styler(df):
+    mode = get_setting("dashboard", "table_render", "auto")
+    if mode == "styled":
+        return True
+    if mode == "fast":
+        return False
+    return df.size <= get_setting("dashboard", "styled_cell_limit", 50000)
+
+
+def render_table(styler, **columns):
+    # `styler` is only evaluated when it is actually rendered, so building it for a large table is cheap
+    df = styler.data
+    styled = use_styler(df)
+    with timed("render", "render_table", mode="styled" if styled else "native", rows=len(df), cells=df.size):
+        if styled:
+            st.dataframe(styler, use_container_width=True, hide_index=True)
+        else:
+            st.dataframe(df, column_config=native_column_config(df, **columns), use_container_width=True, hide_index=True)
@@ -1,6 +1,15 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
+from queries.publishers_stats import PUBLISHER_SORT_COLUMNS, fetch_publisher_summary, fetch_publisher_page, page_cursor, export_publisher_report
+from utils.config import get_setting
+from utils.partitions import filter_fingerprint
+from utils.filters import FILTER_METRICS, FILTER_OPERATORS, compile_filters, filter_mask
+from components.table_render import render_table, native_column_config
+from queries.bad_publishers import bad_publishers_report
+from queries.base_data import COMPARISONS, export_campaign_report
+from utils.export import EXPORT_FORMATS
+from utils.metrics import timed_render
 
 # --- Utility Functions ---
 def color_percentage_change(val):
@@ -24,7 +33,69 @@ def color_pnl(val):
     return ''
 
 
+def add_publisher_filter():
+    st.session_state.num_pub_filters = st.session_state.get('num_pub_filters', 1) + 1
+
+
+def remove_publisher_filter():
+    if st.session_state.get('num_pub_filters', 1) > 1:
+        st.session_state.num_pub_filters -= 1
+
+
+def read_publisher_filters():
+    # The filter rows' current values, readable before the tab is drawn (widget state lives in session_state)
+    rows = [
+        (st.session_state.get(f"metric {i}", ''), st.session_state.get(f"operator {i}", ''), st.session_state.get(f"value {i}", 0.0))
+        for i in range(st.session_state.get('num_pub_filters', 1))
+    ]
+    return compile_filters(rows)
+
+
+def render_export_button(label, name, export, args, start_date, end_date):
+    # The export runs only when the button is clicked, streaming every matching row into the file
+    col_format, col_button = st.columns([2, 3])
+    fmt = col_format.selectbox("Format", list(EXPORT_FORMATS), key=f'{name}_export_format', label_visibility='collapsed')
+    extension, mime = EXPORT_FORMATS[fmt]
+    col_button.download_button(
+        label,
+        data=lambda: export(*args, fmt=fmt),
+        file_name=f"{name}_{start_date}_{end_date}.{extension}",
+        mime=mime,
+        on_click="ignore",
+        key=f'{name}_export')
+
+
+@timed_render
+def render_publisher_page_controls(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, rules=()):
+    page_size = get_setting("dashboard", "publisher_page_size", 100)
+    filters = (user_id_selection, campaign_name_selection, account_id_selection)
+
+    col_sort, col_dir, col_prev, col_next = st.columns([3, 3, 1, 1])
+    sort_by = col_sort.selectbox("Sort by", PUBLISHER_SORT_COLUMNS, key='pub_sort_by')
+    descending = col_dir.radio("Order", ["Descending", "Ascending"], horizontal=True, key='pub_sort_order') == "Descending"
+
+    # Start again from the first page whenever the query behind the pages changes
+    signature = (start_date, end_date, filter_fingerprint(*filters), sort_by, descending, rules)
+    if st.session_state.get('pub_page_signature') != signature:
+        st.session_state.pub_page_signature = signature
+        st.session_state.pub_page_cursors = [None]
+    cursors = st.session_state.pub_page_cursors
+
+    if col_prev.button("◀ Prev", disabled=len(cursors) == 1):
+        cursors.pop()
+    next_clicked = col_next.button("Next ▶")
+
+    df_page = fetch_publisher_page(start_date, end_date, *filters, sort_by=sort_by, descending=descending, page_size=page_size, after=cursors[-1], rules=rules)
+    if next_clicked and len(df_page) == page_size:
+        cursors.append(page_cursor(df_page, sort_by))
+        df_page = fetch_publisher_page(start_date, end_date, *filters, sort_by=sort_by, descending=descending, page_size=page_size, after=cursors[-1], rules=rules)
+
+    st.caption(f"Page {len(cursors)} · {page_size} rows per page")
+    return df_page.drop(columns=['sort_key'], errors='ignore')
+
+
 # --- MAIN TAB FUNCTION ---
+@timed_render
 def render_data_tabs(df_aggregated, df_campaign, df_pub, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection):
     pub_pnl_cols = ['PnL']
     pub_roi_cols = ['ROI']
@@ -36,7 +107,7 @@ def render_data_tabs(df_aggregated, df_campaign, df_pub, start_date, end_date, u
 
     with tab1:
         st.markdown("### 🔄 Daily Aggregated View")
-        st.dataframe(df_aggregated.style \
+        render_table(df_aggregated.style \
                      .map(color_pnl, subset=pnl_cols) \
                      .map(color_percentage_change, subset=roi_cols) \
                      .background_gradient(cmap='Greens', subset=['TCL', 'AFS'], low=0.2, high=0.4) \
@@ -53,10 +124,11 @@ def render_data_tabs(df_aggregated, df_campaign, df_pub, start_date, end_date, u
                          'PL_TCL': lambda x: f"${x:,.2f}" if pd.notna(x) else "-",
                          'ROI_AFS': lambda x: f"{x:,.2f}%" if pd.notna(x) else "-",
                          'ROI_TCL': lambda x: f"{x:,.2f}%" if pd.notna(x) else "-"
-        }), use_container_width=True, hide_index=True)
+        }), counts=['Impr', 'Clicks'], money=['Spend', 'TCL', 'AFS'], signed_money=pnl_cols, percents=roi_cols, bars=pnl_cols)
 
     with tab2:
         st.markdown("### 🎯 Campaign-level View")
+        st.selectbox("Δ compared with", list(COMPARISONS), key="delta_comparison")
         styled_df = df_campaign.style \
             .map(color_percentage_change, subset=percentage_cols) \
             .map(color_percentage_change, subset=roi_cols) \
@@ -82,12 +154,14 @@ def render_data_tabs(df_aggregated, df_campaign, df_pub, start_date, end_date, u
                                 'ROI_TCL': lambda x: f"{x:,.2f}%" if pd.notna(x) else "-"
             })
 
-        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        render_table(styled_df, counts=['Impr', 'Clicks'], money=['Spend', 'TCL', 'AFS'], signed_money=pnl_cols,
+                     percents=percentage_cols + roi_cols, bars=pnl_cols)
+        render_export_button("⬇️ Export campaigns", "campaigns", export_campaign_report,
+                             (start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection), start_date, end_date)
 
     with tab3:
         st.markdown("### 📑 Publishers-level View")
-
-        st.write(f"Total **{len(df_pub)}** publishers with total spend: **${df_pub['Spend'].sum():,.2f}**")
+        header = st.empty()
 
         with st.expander("*🔍 Advanced Publisher Filters*", expanded=False):
             if 'num_pub_filters' not in st.session_state:
@@ -95,52 +169,73 @@ def render_data_tabs(df_aggregated, df_campaign, df_pub, start_date, end_date, u
 
             col_add, col_remove = st.columns(2)
 
+            # Callbacks run before the rerun, so main.py already sees the new filter rows when it fetches
             with col_add:
-                if st.button("➕ Add Filter"):
-                    st.session_state.num_pub_filters += 1
+                st.button("➕ Add Filter", on_click=add_publisher_filter)
 
             with col_remove:
-                if st.button("❌ Remove Last Filter") and st.session_state.num_pub_filters > 1:
-                    st.session_state.num_pub_filters -= 1
+                st.button("❌ Remove Last Filter", on_click=remove_publisher_filter)
 
-            filter_metrics = ['', 'Spend', 'Clicks', 'Impr', 'ROI']
-            operators = ['', '>', '<', '>=', '<=', '=']
-
-            filtered_pub_df = df_pub.copy()
+            filter_metrics = [''] + FILTER_METRICS
+            operators = [''] + list(FILTER_OPERATORS)
 
+            filter_rows = []
             for i in range(st.session_state.num_pub_filters):
                 filter_row = st.columns([3, 2, 3])
 
                 metric = filter_row[0].selectbox(f"Metric", filter_metrics, key=f"metric {i}")
                 operator = filter_row[1].selectbox(f"Operator", operators, key=f"operator {i}")
-                value = filter_row[2].number_input(f"Value", key={i}, step=0.01)
-
-                if metric in filtered_pub_df.columns:
-                    if operator == '>':
-                        filtered_pub_df = filtered_pub_df[filtered_pub_df[metric] > value]
-                    elif operator == '<':
-                        filtered_pub_df = filtered_pub_df[filtered_pub_df[metric] < value]
-                    elif operator == '>=':
-                        filtered_pub_df = filtered_pub_df[filtered_pub_df[metric] >= value]
-                    elif operator == '<=':
-                        filtered_pub_df = filtered_pub_df[filtered_pub_df[metric] <= value]
-                    elif operator == '=':
-                        filtered_pub_df = filtered_pub_df[filtered_pub_df[metric] == value]
-
-        styled_pub_df = filtered_pub_df.style \
-            .map(color_percentage_change, subset=pub_roi_cols) \
-            .map(color_pnl, subset=pub_pnl_cols) \
-            .background_gradient(cmap='Greens', subset=['Impr', 'Clicks', 'Revenue'], low=0.2, high=0.4) \
-            .background_gradient(cmap='Oranges', subset=['Spend'], low=0.2, high=0.8) \
-            .bar(subset=['ROI'], align='zero', color=['#FF6347', '#7CFC00']) \
-            .format({
-                'Date': lambda x: x.strftime("%Y-%m-%d") if isinstance(x, (pd.Timestamp, date)) else x,
-                "Impr": "{:,.0f}",
-                "Clicks": "{:,.0f}",
-                'Spend': lambda x: f"${x:,.2f}" if pd.notna(x) else "-",
-                'Revenue': lambda x: f"${x:,.2f}" if pd.notna(x) else "-",
-                'ROI': lambda x: f"{x:.2f}%" if pd.notna(x) else "-",
-                'PnL': lambda x: f"{x:.2f}%" if pd.notna(x) else "-"
-            })
-
-        st.dataframe(styled_pub_df, use_container_width=True, hide_index=True)
+                value = filter_row[2].number_input(f"Value", key=f"value {i}", step=0.01)
+                filter_rows.append((metric, operator, value))
+
+        rules = compile_filters(filter_rows)
+
+        # df_pub is None in paged mode: the header comes from a count/sum query and rows are fetched a page at a time
+        if df_pub is None:
+            # A failed summary query (already reported) shows zeros for this rerun only
+            total_publishers, total_spend = fetch_publisher_summary(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, rules) or (0, 0.0)
+            filtered_pub_df = render_publisher_page_controls(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, rules)
+        else:
+            # Already filtered in SQL unless main.py found the unfiltered report cached; the mask covers both cases
+            filtered_pub_df = df_pub[filter_mask(df_pub, rules)]
+            total_publishers, total_spend = len(filtered_pub_df), (filtered_pub_df['Spend'].sum() if not filtered_pub_df.empty else 0.0)
+
+        header.write(f"Total **{total_publishers}** publishers with total spend: **${total_spend:,.2f}**")
+
+        if filtered_pub_df.columns.empty:
+            st.info("No publisher data available for the current selection.")
+        else:
+            styled_pub_df = filtered_pub_df.style \
+                .map(color_percentage_change, subset=pub_roi_cols) \
+                .map(color_pnl, subset=pub_pnl_cols) \
+                .background_gradient(cmap='Greens', subset=['Impr', 'Clicks', 'Revenue'], low=0.2, high=0.4) \
+                .background_gradient(cmap='Oranges', subset=['Spend'], low=0.2, high=0.8) \
+                .bar(subset=['ROI'], align='zero', color=['#FF6347', '#7CFC00']) \
+                .format({
+                    'Date': lambda x: x.strftime("%Y-%m-%d") if isinstance(x, (pd.Timestamp, date)) else x,
+                    "Impr": "{:,.0f}",
+                    "Clicks": "{:,.0f}",
+                    'Spend': lambda x: f"${x:,.2f}" if pd.notna(x) else "-",
+                    'Revenue': lambda x: f"${x:,.2f}" if pd.notna(x) else "-",
+                    'ROI': lambda x: f"{x:.2f}%" if pd.notna(x) else "-",
+                    'PnL': lambda x: f"{x:.2f}%" if pd.notna(x) else "-"
+                })
+
+            render_table(styled_pub_df, counts=['Impr', 'Clicks'], money=['Spend', 'Revenue'], signed_money=pub_pnl_cols,
+                         percents=pub_roi_cols, bars=pub_roi_cols)
+            render_export_button("⬇️ Export publishers", "publishers", export_publisher_report,
+                                 (start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, rules), start_date, end_date)
+
+        with st.expander("*🚫 Bad Publishers*", expanded=False):
+            st.caption("Domains not blocked yet, scored on sustained losses, ROI, spend without clicks and distance from their campaign's ROI.")
+            min_spend = st.number_input("Minimum spend ($)", value=5.0, min_value=0.0, step=1.0, key='bad_pub_min_spend')
+
+            if st.toggle("Score publishers", key='bad_pub_enabled'):
+                df_bad = bad_publishers_report(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, min_spend)
+                if df_bad.empty:
+                    st.info("No unblocked publishers above the minimum spend in this period.")
+                else:
+                    bad_pub_config = native_column_config(df_bad, counts=['Clicks', 'Active Days', 'Losing Days'], money=['Spend', 'Revenue', 'Zero-Click Spend'],
+                                                          signed_money=['PnL'], percents=['ROI', 'Campaign ROI'])
+                    bad_pub_config['Score'] = st.column_config.ProgressColumn('Score', format='%.1f', min_value=0, max_value=100)
+                    st.dataframe(df_bad, column_config=bad_pub_config, use_container_width=True, hide_index=True)
@@ -2,18 +2,23 @@ import streamlit as st
 import pandas as pd
 from datetime import date, timedelta
 from streamlit_extras.metric_cards import style_metric_cards
-from queries.campaign_stats import fetch_data
-from queries.daily_stats import fetch_aggregated_daily_data
-from queries.chart_data import fetch_overall_trend_data
-from queries.publishers_stats import fetch_publisher_report
+from queries.base_data import derive_campaign_table, derive_daily_table, derive_trend_series, trim_base, DEFAULT_COMPARISON
+from queries.dashboard import dashboard_tasks, period_totals
 from components.sidebar_filters import render_sidebar_filters
 from components.kpis import render_kpi_block
-from components.charts import render_line_chart
-from components.tabs import render_data_tabs
+from components.charts import render_line_chart, render_breakdown_chart
+from components.tabs import render_data_tabs, read_publisher_filters
+from components.debug_panel import render_debug_panel
+from utils.config import get_setting
+from utils.concurrency import run_concurrently
+from utils.metrics import begin_rerun
+from utils.warmup import start_warmup, note_selection
 
 
 # --- Streamlit Config ---
 st.set_page_config(page_title="📊 Campaign Dashboard", layout="wide")
+begin_rerun()
+start_warmup()
 
 
 
@@ -32,28 +37,41 @@ start_date, end_date, account_id_selection, user_id_selection, campaign_name_sel
 
 
 # --- Fetch Core Data ---
-df_campaign_table = fetch_data(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
-
-df_daily_aggregated = fetch_aggregated_daily_data(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
-
-df_pub_data = fetch_publisher_report(start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
-
+# Single base fetch mode derives the campaign, daily and chart views from one date x campaign frame
+single_base_fetch = get_setting("dashboard", "single_base_fetch", False)
 
+filters = (user_id_selection, campaign_name_selection, account_id_selection)
+# Picked in the campaign tab; the Δ columns are derived from the base frame, so switching costs no query
+comparison = st.session_state.get("delta_comparison", DEFAULT_COMPARISON)
+note_selection(filters)
 
 # --- Determine if Overall or Filtered Charts Should Be Used ---
 is_filtered_by_campaigns = bool(campaign_name_selection)
 is_filtered_by_users = bool(user_id_selection)
 #is_filtered_by_accounts = bool(account_id_selection)
+is_overall = not is_filtered_by_campaigns and not is_filtered_by_users
+
+# None of these depend on each other, so they are dispatched together and the page waits for the slowest
+tasks = dashboard_tasks(start_date, end_date, filters, comparison, read_publisher_filters())
+results = run_concurrently(tasks)
 
+if single_base_fetch:
+    df_base = trim_base(results["base"], start_date)
+    df_campaign_table = derive_campaign_table(results["base"], start_date, comparison)
+    df_daily_aggregated = derive_daily_table(df_base)
+else:
+    df_campaign_table = results["campaigns"]
+    df_daily_aggregated = results["daily"]
+
+df_pub_data = results.get("publishers")
+kpi_totals = period_totals(results, start_date, end_date)
 
-if not is_filtered_by_campaigns and not is_filtered_by_users:
-    df_for_charts = fetch_overall_trend_data(start_date, end_date)
+
+if is_overall:
+    df_for_charts = derive_trend_series(df_base) if single_base_fetch else results["trend"]
     chart_title_suffix = " (Overall Performance)"
 else:
-    if not df_campaign_table.empty:
-        df_for_charts = df_campaign_table.groupby("Date", as_index=False).agg({"Spend": "sum", "TCL": "sum"})
-    else:
-        df_for_charts = pd.DataFrame(columns=["Date", "Spend", "TCL"])
+    df_for_charts = derive_trend_series(df_campaign_table)
     chart_title_suffix = " (Filtered Performance)"
 
 
@@ -65,12 +83,13 @@ if not df_campaign_table.empty:
     st.divider()
 
     # --- KPI Cards ---
-    render_kpi_block(df_campaign_table, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
+    render_kpi_block(df_campaign_table, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection, kpi_totals)
 
     st.divider()
 
     # --- Line Chart ---
     render_line_chart(df_for_charts, chart_title_suffix)
+    render_breakdown_chart(df_campaign_table, start_date, end_date, user_id_selection, campaign_name_selection, account_id_selection)
 
     st.divider()
 
@@ -83,3 +102,5 @@ else:
 
 st.divider()
 st.caption("Crafted with ❤️ by dkamp007!")
+
+render_debug_panel()
@@ -1,26 +1,221 @@
-import streamlit as st
+import numpy as np
+import pandas as pd
 from utils.db import run_query
-from queries.publishers_stats import fetch_publisher_report
+from utils.query_builder import REPORT_TABLES, report_where, report_table
+from utils.partitions import fetch_partitioned, filter_fingerprint
+from utils.cache import cached
+from utils.watermark import data_version
 
-# ---Caching for better performance---
+# Weights of the individual signals in the 0-100 score
+SCORE_WEIGHTS = {
+    'sustained_loss': 0.35,
+    'roi': 0.25,
+    'zero_click_spend': 0.25,
+    'campaign_deviation': 0.15,
+}
+
+# Column types of the date x campaign x domain rows the scorer reads
+SCORE_DTYPES = {'Clicks': 'int64', 'Spend': 'float64', 'Revenue': 'float64'}
 
-@st.cache_data(ttl=21600)
-def bad_publishers_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None):
+# --- Rows to score: metrics per date x campaign x domain, blocked flags per ad group x domain ---
+# The publisher report is grouped by date x domain, with one arbitrary campaign and blocked state
+# per row, so the scorer reads its own queries at the grains it needs.
 
-    conditions = [f"a.api_data_date BETWEEN '{start_date}' AND '{end_date}'"]
+def _fetch_score_rows(start_date, end_date, user_id=None, campaign_names=None, account_id=None):
+    where_clause, params = report_where("publisher", start_date, end_date, user_id, campaign_names, account_id)
+    table = report_table("publisher", start_date, end_date, ["publisher", "campaign_name"], user_id, campaign_names, account_id)
+
+    query = f"""
+        select
+            a.api_data_date as Date,
+            a.campaign_name as Campaign,
+            a.final_main_domain as Publisher,
+            sum(a.pbt_adclick_count) as Clicks,
+            sum(a.bing_spend) as Spend,
+            sum(a.tcl_revenue) as Revenue
+        from {table} a
+        where {where_clause}
+        group by a.api_data_date, a.campaign_name, a.final_main_domain
+    """
+    return run_query(query, params, source="reports", dtypes=SCORE_DTYPES)
 
-    if account_id:
-        account_list = ','.join(map(str, account_list))
-        conditions.append(f"a.account_id IN ({account_list})")
-    if user_id:
-        user_conditions = ','.join(map(str, user_conditions))
-        conditions.append(f"b.user_id IN ({user_conditions})")
-    if campaign_names:
-        campaign_list = ','.join(campaign_list)
-        conditions.append(f"a.campaign_names IN ({campaign_list})")
 
-    where_clause = ' AND '.join(conditions)
+def _fetch_blocked_flags(start_date, end_date, user_id=None, campaign_names=None, account_id=None):
+    # Each campaign x ad group x domain's flags on its most recent day in the range. The rollups fold
+    # ad groups away, so this always reads the report table.
+    where_clause, params = report_where("publisher", start_date, end_date, user_id, campaign_names, account_id)
 
     query = f"""
-        
+        select Campaign, Publisher, `Blocked (Ad Group)`, `Blocked (Campaign)`
+        from (
+            select
+                a.campaign_name as Campaign,
+                a.final_main_domain as Publisher,
+                a.blocked_at_ad_group as `Blocked (Ad Group)`,
+                a.blocked_at_campaign as `Blocked (Campaign)`,
+                row_number() over (
+                    partition by a.campaign_name, a.ad_group_name, a.final_main_domain
+                    order by a.api_data_date desc
+                ) as recency
+            from {REPORT_TABLES['publisher']['table']} a
+            where {where_clause}
+        ) latest
+        where recency = 1
     """
+    return run_query(query, params, source="reports")
+
+
+# --- Score every publisher at once to find money-losing domains worth blocking ---
+
+def _as_flag(values):
+    # Blocked columns may hold 0/1 or yes/no style values
+    numeric = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy() != 0
+    text = values.astype(str).str.strip().str.lower().isin(['true', 'yes', 'y', 'blocked']).to_numpy()
+    return numeric | text
+
+
+def _safe_ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _blocked_publishers(df_blocked, publishers):
+    # A domain is already blocked when every campaign it ran in has blocked it: at campaign level, or
+    # in each of the campaign's ad groups
+    if df_blocked.empty:
+        return np.zeros(len(publishers), dtype=bool)
+    flags = pd.DataFrame({
+        'Publisher': df_blocked['Publisher'].astype(str).to_numpy(),
+        'Campaign': df_blocked['Campaign'].astype(str).to_numpy(),
+        'ad_group': _as_flag(df_blocked['Blocked (Ad Group)']),
+        'campaign': _as_flag(df_blocked['Blocked (Campaign)']),
+    })
+    pairs = flags.groupby(['Publisher', 'Campaign'], sort=False).agg(ad_group=('ad_group', 'all'), campaign=('campaign', 'any'))
+    blocked = (pairs['ad_group'] | pairs['campaign']).groupby(level='Publisher', sort=False).all()
+    return blocked.reindex(pd.Index(publishers).astype(str), fill_value=False).to_numpy()
+
+
+def score_publishers(df_rows, df_blocked, min_spend=5.0):
+    # df_rows: date x campaign x domain metrics; df_blocked: latest flags per campaign x ad group x domain
+    if df_rows.empty:
+        return pd.DataFrame()
+
+    pub_codes, publishers = pd.factorize(df_rows['Publisher'])
+    day_codes, _ = pd.factorize(pd.to_datetime(df_rows['Date']), sort=True)
+    spend = df_rows['Spend'].to_numpy(dtype=float, na_value=0.0)
+    revenue = df_rows['Revenue'].to_numpy(dtype=float, na_value=0.0)
+    clicks = df_rows['Clicks'].to_numpy(dtype=float, na_value=0.0)
+    latest_blocked = _blocked_publishers(df_blocked, publishers)
+
+    total_spend = np.bincount(pub_codes, weights=spend, minlength=len(publishers))
+    candidates = np.flatnonzero((total_spend >= min_spend) & ~latest_blocked)
+    if candidates.size == 0:
+        return pd.DataFrame()
+
+    # Publisher x day totals of the candidates' rows; only the (publisher, day) pairs that occur
+    candidate_index = np.full(len(publishers), -1)
+    candidate_index[candidates] = np.arange(candidates.size)
+    rows = candidate_index[pub_codes]
+    keep = rows >= 0
+    daily = pd.DataFrame({
+        'row': rows[keep], 'day': day_codes[keep], 'spend': spend[keep], 'revenue': revenue[keep], 'clicks': clicks[keep],
+    }).groupby(['row', 'day'], sort=False).sum()
+
+    active = daily['spend'] > 0
+    per_pub = daily.assign(
+        active=active,
+        losing=active & (daily['revenue'] < daily['spend']),
+        zero_click_spend=daily['spend'].where(daily['clicks'] == 0, 0.0),
+    ).groupby(level='row').sum().reindex(np.arange(candidates.size), fill_value=0)
+
+    pub_spend = per_pub['spend'].to_numpy()
+    pub_revenue = per_pub['revenue'].to_numpy()
+    pub_clicks = per_pub['clicks'].to_numpy()
+    pub_roi = _safe_ratio(pub_revenue - pub_spend, pub_spend) * 100
+
+    # Sustained loss: share of active days on which the domain lost money
+    active_days = per_pub['active'].to_numpy()
+    losing_days = per_pub['losing'].to_numpy()
+    sustained_loss = _safe_ratio(losing_days, active_days)
+
+    # Spend on days that produced no clicks at all
+    zero_click_spend = per_pub['zero_click_spend'].to_numpy()
+    zero_click_share = _safe_ratio(zero_click_spend, pub_spend)
+
+    # Deviation from the campaign baseline. Each campaign's ROI and the spend-weighted spread of its
+    # publishers' ROI around it come from every row, including domains below min_spend or blocked.
+    # A domain is then scored on each of its campaigns (z-score of its ROI there), weighted by spend.
+    campaign_codes, campaigns = pd.factorize(df_rows['Campaign'], use_na_sentinel=False)
+    campaign_spend = np.bincount(campaign_codes, weights=spend, minlength=len(campaigns))
+    campaign_revenue = np.bincount(campaign_codes, weights=revenue, minlength=len(campaigns))
+    campaign_roi = _safe_ratio(campaign_revenue - campaign_spend, campaign_spend) * 100
+
+    pairs = pd.DataFrame({'pub': pub_codes, 'campaign': campaign_codes, 'spend': spend, 'revenue': revenue}) \
+        .groupby(['pub', 'campaign'], sort=False).sum().reset_index()
+    pair_campaign = pairs['campaign'].to_numpy()
+    pair_spend = pairs['spend'].to_numpy()
+    pair_roi = _safe_ratio(pairs['revenue'].to_numpy() - pair_spend, pair_spend) * 100
+    roi_gap = np.nan_to_num(pair_roi) - np.nan_to_num(campaign_roi)[pair_campaign]
+    campaign_var = _safe_ratio(np.bincount(pair_campaign, weights=pair_spend * roi_gap ** 2, minlength=len(campaigns)), campaign_spend)
+    roi_z = _safe_ratio(roi_gap, np.sqrt(campaign_var)[pair_campaign])
+
+    pairs = pairs.assign(row=candidate_index[pairs['pub']], deviation=np.clip(-np.nan_to_num(roi_z) / 3, 0, 1))
+    pairs = pairs[pairs['row'] >= 0]
+    pair_weight = pairs['spend'] * pairs['deviation']
+    campaign_deviation = _safe_ratio(np.bincount(pairs['row'], weights=pair_weight, minlength=candidates.size), pub_spend)
+
+    # The campaign each domain falls furthest below (else its biggest one), shown with that campaign's ROI
+    worst = pairs.assign(weight=pair_weight).sort_values(['row', 'weight', 'spend'], ascending=[True, False, False]).drop_duplicates('row')
+    pub_campaign = np.zeros(candidates.size, dtype=int)
+    pub_campaign[worst['row'].to_numpy()] = worst['campaign'].to_numpy()
+
+    signals = {
+        'sustained_loss': np.nan_to_num(sustained_loss),
+        'roi': np.clip(-np.nan_to_num(pub_roi) / 100, 0, 1),
+        'zero_click_spend': np.nan_to_num(zero_click_share),
+        'campaign_deviation': np.nan_to_num(campaign_deviation),
+    }
+    score = 100 * sum(SCORE_WEIGHTS[name] * signal for name, signal in signals.items())
+
+    reasons = np.full(candidates.size, '', dtype=object)
+    reasons = np.where(signals['sustained_loss'] >= 0.5, reasons + 'losing most days; ', reasons)
+    reasons = np.where(pub_roi <= -50, reasons + 'ROI below -50%; ', reasons)
+    reasons = np.where(signals['zero_click_spend'] >= 0.5, reasons + 'spend without clicks; ', reasons)
+    reasons = np.where(signals['campaign_deviation'] >= 0.5, reasons + 'far below campaign ROI; ', reasons)
+
+    report = pd.DataFrame({
+        'Publisher': publishers[candidates],
+        'Campaign': campaigns[pub_campaign],
+        'Spend': pub_spend.round(2),
+        'Revenue': pub_revenue.round(2),
+        'PnL': (pub_revenue - pub_spend).round(2),
+        'ROI': np.round(pub_roi, 2),
+        'Campaign ROI': np.round(campaign_roi[pub_campaign], 2),
+        'Clicks': pub_clicks,
+        'Active Days': active_days,
+        'Losing Days': losing_days,
+        'Zero-Click Spend': zero_click_spend.round(2),
+        'Score': score.round(1),
+        'Reasons': pd.Series(reasons).str.rstrip('; ').to_numpy(),
+    })
+    return report.sort_values(['Score', 'PnL'], ascending=[False, True], ignore_index=True)
+
+
+# ---Caching for better performance---
+
+@cached(version=data_version("publisher"))
+def bad_publishers_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None, min_spend=5.0):
+    # The metric rows are cached per day, so re-scoring a shifted range only queries the new days
+    df_rows = fetch_partitioned(
+        "bad_publishers",
+        filter_fingerprint(user_id, campaign_names, account_id),
+        start_date,
+        end_date,
+        lambda range_start, range_end: _fetch_score_rows(range_start, range_end, user_id, campaign_names, account_id),
+        report="publisher",
+    )
+    df_blocked = _fetch_blocked_flags(start_date, end_date, user_id, campaign_names, account_id)
+    if df_blocked.columns.empty:
+        # Failed query: a frame without columns isn't cached, so the next rerun retries
+        return df_blocked
+    return score_publishers(df_rows, df_blocked, min_spend)
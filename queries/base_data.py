@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from utils.db import run_query, stream_query
+from utils.export import export_file
+from utils.cache import cast_frame
+from utils.query_builder import report_where, report_table
+from utils.partitions import fetch_partitioned, peek_partitioned, filter_fingerprint
+
+METRIC_COLUMNS = ['Impr', 'Clicks', 'Spend', 'TCL', 'AFS']
+
+# What the campaign table's Δ columns compare each day with
+COMPARISONS = {
+    "Previous day": pd.DateOffset(days=1),
+    "Same day last week": pd.DateOffset(weeks=1),
+    "Same day last month": pd.DateOffset(months=1),
+}
+DEFAULT_COMPARISON = "Previous day"
+
+# Column types of the base rows, whichever path fetched them (utils/db.py)
+BASE_DTYPES = {'Impr': 'int64', 'Spend': 'float64', 'Clicks': 'int64', 'BingClicks': 'int64', 'TCL': 'float64', 'AFS': 'float64'}
+
+# Column types of the exported campaign report
+EXPORT_DTYPES = {'Campaign': 'str', 'Impr': 'Int64', 'Clicks': 'Int64', 'Spend': 'float64', 'TCL': 'float64', 'AFS': 'float64'}
+
+# --- Date x campaign base frame; the campaign, daily, chart and KPI views are all derived from it ---
+
+def _base_query(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    where_clause, params = report_where("campaign", start_date, end_date, user_ids, campaign_names, account_id)
+    table = report_table("campaign", start_date, end_date, ["campaign_name"], user_ids, campaign_names, account_id)
+
+    query = f"""
+        SELECT
+            bop.api_data_date AS Date,
+            bop.bing_campaign_name AS Campaign,
+            SUM(bop.bing_impressions) AS Impr,
+            SUM(bop.bing_spend) AS Spend,
+            SUM(bop.pbt_adclick_count) AS Clicks,
+            SUM(bop.bing_clicks) AS BingClicks,
+            SUM(bop.tcl_revenue) AS TCL,
+            SUM(bop.afs_estimated_earnings) AS AFS
+        FROM
+            {table} bop
+        WHERE {where_clause}
+        GROUP BY bop.api_data_date, bop.bing_campaign_name
+    """
+    return query, params
+
+
+def _fetch_base_rows(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    query, params = _base_query(start_date, end_date, user_ids, campaign_names, account_id)
+    return run_query(query, params, source="reports", dtypes=BASE_DTYPES)
+
+
+def fetch_base_data(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    return fetch_partitioned(
+        "base_data",
+        filter_fingerprint(user_ids, campaign_names, account_id),
+        start_date,
+        end_date,
+        lambda range_start, range_end: _fetch_base_rows(range_start, range_end, user_ids, campaign_names, account_id),
+    )
+
+
+def peek_base_data(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    # The cached base frame for the range, or None if any day would need a query
+    return peek_partitioned("base_data", filter_fingerprint(user_ids, campaign_names, account_id), start_date, end_date)
+
+
+def _pct_change(current, previous):
+    return ((current - previous) / previous.replace(0, np.nan) * 100).round(2)
+
+
+def _add_profit_columns(out, df):
+    out['PL_AFS'] = (df['AFS'] - df['Spend']).round(2)
+    out['PL_TCL'] = (df['TCL'] - df['Spend']).round(2)
+    out['ROI_AFS'] = _pct_change(df['AFS'], df['Spend'])
+    out['ROI_TCL'] = _pct_change(df['TCL'], df['Spend'])
+    return out
+
+
+def comparison_start(start_date):
+    # The campaign table reads its base frame from here, so every comparison's earlier days are in it
+    return min((pd.Timestamp(start_date) - offset).date() for offset in COMPARISONS.values())
+
+
+def trim_base(base, start_date):
+    # The base frame without the leading days fetched for the comparisons
+    if base.empty:
+        return base
+    return base[pd.to_datetime(base['Date']) >= pd.Timestamp(start_date)].reset_index(drop=True)
+
+
+def derive_campaign_table(base, start_date=None, comparison=DEFAULT_COMPARISON):
+    if base.empty:
+        return base
+    # Each row is matched to the same campaign's row on the comparison day, which may lie before
+    # start_date; days without a row there get no delta
+    day = pd.to_datetime(base['Date'])
+    earlier = base[['Campaign', *METRIC_COLUMNS]].assign(_day=day)
+    df = base.assign(_day=day - COMPARISONS[comparison])
+    if start_date is not None:
+        df = df[day >= pd.Timestamp(start_date)]
+    df = df.merge(earlier, on=['Campaign', '_day'], how='left', suffixes=('', '_prev'))
+    df = df.sort_values(['Campaign', 'Date'], ignore_index=True)
+
+    out = df[['Date', 'Campaign']].copy()
+    for col in METRIC_COLUMNS:
+        out[col] = df[col]
+        out[f'{col}_Δ'] = _pct_change(df[col].astype(float), df[f'{col}_prev'].astype(float))
+    out = _add_profit_columns(out, df)
+    return out.sort_values('Date', ascending=False, kind='stable', ignore_index=True)
+
+
+def export_campaign_report(start_date, end_date, user_ids=None, campaign_names=None, account_id=None, fmt="CSV"):
+    # Date x campaign rows with their profit columns, streamed into a file (utils/export.py). The Δ
+    # columns compare rows across chunks, so they are left to the dashboard table.
+    query, params = _base_query(start_date, end_date, user_ids, campaign_names, account_id)
+    chunks = stream_query(f"{query} ORDER BY Date DESC, Campaign", params, source="reports")
+    columns = ['Date', 'Campaign', *METRIC_COLUMNS]
+    typed = (cast_frame(chunk, EXPORT_DTYPES) for chunk in chunks)
+    return export_file((_add_profit_columns(chunk[columns].copy(), chunk) for chunk in typed), fmt)
+
+
+def derive_daily_table(base):
+    if base.empty:
+        return base
+    # The daily view counts Bing-reported clicks rather than tracked ad clicks. Partitions hold
+    # downcast integer columns, so totals are summed as floats.
+    columns = ['Impr', 'BingClicks', 'Spend', 'TCL', 'AFS']
+    df = base[columns].astype(float).groupby(base['Date']).sum().reset_index()
+    df = df.rename(columns={'BingClicks': 'Clicks'})
+    out = _add_profit_columns(df[['Date', 'Impr', 'Clicks', 'Spend', 'TCL', 'AFS']].copy(), df)
+    return out.sort_values('Date', ascending=False, ignore_index=True)
+
+
+def derive_trend_series(base):
+    if base.empty:
+        return pd.DataFrame(columns=['Date', 'Spend', 'TCL'])
+    df = base[['Spend', 'TCL']].astype(float).groupby(base['Date']).sum().reset_index()
+    return df.sort_values('Date', ignore_index=True)
+
+
+def derive_kpi_totals(base):
+    if base.empty:
+        return {'Spend': 0.0, 'TCL': 0.0, 'AFS': 0.0}
+    totals = base[['Spend', 'TCL', 'AFS']].to_numpy(dtype=float).sum(axis=0)
+    return dict(zip(['Spend', 'TCL', 'AFS'], totals.tolist()))
+
+
+def derive_period_totals(base, start_date, end_date, prev_start_date, prev_end_date):
+    # KPI totals of the current and previous periods, for a base frame reaching back over both
+    if base.empty:
+        return derive_kpi_totals(base), derive_kpi_totals(base)
+    day = pd.to_datetime(base['Date'])
+    current = base[(day >= pd.Timestamp(start_date)) & (day <= pd.Timestamp(end_date))]
+    previous = base[(day >= pd.Timestamp(prev_start_date)) & (day <= pd.Timestamp(prev_end_date))]
+    return derive_kpi_totals(current), derive_kpi_totals(previous)
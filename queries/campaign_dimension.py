@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from utils.db import run_query
+from utils.cache import cached, get_result_cache
+from utils.query_builder import PERMISSION_TABLE, report_table
+from utils.watermark import current_watermark, last_closed_day
+
+# --- In-memory campaign dimension ---
+# One row per (campaign id, name, account) with the first and last day it has data, plus the
+# campaign -> user permissions. The sidebar scopes and searches campaigns against it instead of
+# running SELECT DISTINCT over the fact table for every date range and user selection.
+# Closed days are scanned once and then extended by the newly closed days as the cutoff moves;
+# only the open days are re-read when a load lands.
+
+# How far back to look for the spans of an earlier cutoff before scanning the whole history again
+_LOOKBACK_DAYS = 14
+
+_SPAN_KEYS = ['campaign_id', 'campaign_name', 'account_id']
+
+
+def _span_query(table):
+    return f"""
+        SELECT
+                bop.bing_campaign_id AS campaign_id,
+                bop.bing_campaign_name AS campaign_name,
+                bop.bing_account_id AS account_id,
+                MIN(bop.api_data_date) AS first_date,
+                MAX(bop.api_data_date) AS last_date
+        FROM
+                {table} bop
+        WHERE
+                {{condition}}
+        GROUP BY
+                bop.bing_campaign_id, bop.bing_campaign_name, bop.bing_account_id
+    """
+
+
+def _merge_spans(frames):
+    # A campaign seen in several spans gets one, from its first to its last day
+    spans = pd.concat(frames, ignore_index=True)
+    return spans.groupby(_SPAN_KEYS, observed=True, as_index=False) \
+        .agg(first_date=('first_date', 'min'), last_date=('last_date', 'max'))
+
+
+def _closed_spans(cutoff):
+    # Final days never change, so the spans through a cutoff are the spans through an earlier one
+    # plus the days closed since; only a cold cache scans the whole history
+    cache = get_result_cache()
+    key = ("campaign_closed_spans", cutoff)
+    spans = cache.get(key)
+    if spans is not None:
+        return spans
+
+    since = None
+    for days in range(1, _LOOKBACK_DAYS + 1):
+        previous = cache.get(("campaign_closed_spans", cutoff - timedelta(days=days)))
+        if previous is not None:
+            since = cutoff - timedelta(days=days)
+            break
+
+    grain = ["campaign_id", "campaign_name", "account"]
+    if since is None:
+        query = _span_query(report_table("campaign", date.min, cutoff, grain))
+        spans = run_query(query.format(condition="bop.api_data_date <= :cutoff"), {"cutoff": cutoff}, source="reports")
+    else:
+        # A bounded range, so it can be read from the date x campaign rollup
+        query = _span_query(report_table("campaign", since + timedelta(days=1), cutoff, grain))
+        new_days = run_query(query.format(condition="bop.api_data_date > :since AND bop.api_data_date <= :cutoff"),
+                             {"since": since, "cutoff": cutoff}, source="reports")
+        if new_days.columns.empty:
+            return new_days
+        spans = _merge_spans([previous, new_days]) if not new_days.empty else previous
+    if not spans.columns.empty:
+        # A frame without columns is a failed query; retried on the next call
+        cache.put(key, spans)
+    return spans
+
+
+@cached()
+def _open_spans(cutoff, token):
+    table = report_table("campaign", cutoff + timedelta(days=1), date.today(), ["campaign_id", "campaign_name", "account"])
+    return run_query(_span_query(table).format(condition="bop.api_data_date > :cutoff"), {"cutoff": cutoff}, source="reports")
+
+
+@cached(ttl=21600)
+def _campaign_owners():
+    return run_query(f"SELECT DISTINCT campaign_id, user_id FROM {PERMISSION_TABLE}", source="reports")
+
+
+class CampaignDimension:
+    def __init__(self, spans, owners):
+        # A campaign seen in both the closed and the open days gets one span
+        spans = _merge_spans([spans.dropna(subset=['campaign_name'])])
+
+        self.campaign_ids = spans['campaign_id'].to_numpy()
+        self.account_ids = spans['account_id'].to_numpy()
+        self.names = spans['campaign_name'].astype(str).to_numpy(dtype=object)
+        self.first_dates = pd.to_datetime(spans['first_date']).to_numpy().astype('datetime64[D]')
+        self.last_dates = pd.to_datetime(spans['last_date']).to_numpy().astype('datetime64[D]')
+        self.owners = owners
+
+        # Search index: lower-cased names, plus their sorted order for binary-searched prefix matches
+        self._lower = np.char.lower(self.names.astype(str))
+        self._order = np.argsort(self._lower, kind='stable')
+        self._sorted = self._lower[self._order]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __sizeof__(self):
+        # Lets the byte-budget cache account for the arrays
+        arrays = [self.campaign_ids, self.account_ids, self.first_dates, self.last_dates, self._lower, self._order, self._sorted]
+        names = sum(len(name) + 49 for name in self.names)
+        return sum(a.nbytes for a in arrays) + names + int(self.owners.memory_usage(deep=True).sum())
+
+    def scope(self, start_date, end_date, user_ids=None, account_ids=None):
+        # Rows active in the date range, owned by any of the users and in any of the accounts;
+        # an empty or "all" selection leaves that filter out
+        mask = (self.first_dates <= np.datetime64(end_date, 'D')) & (self.last_dates >= np.datetime64(start_date, 'D'))
+        if account_ids:
+            mask &= np.isin(self.account_ids, list(account_ids))
+        if user_ids:
+            owned = self.owners.loc[self.owners['user_id'].isin(list(user_ids)), 'campaign_id'].unique()
+            mask &= np.isin(self.campaign_ids, owned)
+        return mask
+
+    def names_in(self, mask):
+        return sorted(set(self.names[mask]))
+
+    def search(self, text, mask=None, limit=50):
+        # Names starting with the text first, then names containing it, alphabetically within each
+        text = text.strip().lower()
+        if mask is None:
+            mask = np.ones(len(self), dtype=bool)
+        if not text:
+            rows = self._order[mask[self._order]]
+        else:
+            left = np.searchsorted(self._sorted, text, side='left')
+            right = np.searchsorted(self._sorted, text + '\U0010ffff', side='right')
+            prefix = self._order[left:right]
+            contains = self._order[np.char.find(self._sorted, text) > 0]
+            rows = np.concatenate([prefix[mask[prefix]], contains[mask[contains]]])
+
+        found = []
+        seen = set()
+        for name in self.names[rows]:
+            if name not in seen:
+                seen.add(name)
+                found.append(name)
+                if len(found) == limit:
+                    break
+        return found
+
+
+@cached()
+def _build_dimension(cutoff, token):
+    spans = pd.concat([_closed_spans(cutoff), _open_spans(cutoff, token)], ignore_index=True)
+    owners = _campaign_owners()
+    if spans.empty:
+        spans = pd.DataFrame(columns=['campaign_id', 'campaign_name', 'account_id', 'first_date', 'last_date'])
+    if owners.empty:
+        owners = pd.DataFrame(columns=['campaign_id', 'user_id'])
+    return CampaignDimension(spans, owners)
+
+
+def get_campaign_dimension():
+    watermark = current_watermark("campaign")
+    return _build_dimension(last_closed_day(watermark), watermark.token)
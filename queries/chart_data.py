@@ -1,25 +1,59 @@
-import streamlit as st
 from utils.db import run_query
+from utils.query_builder import report_where, report_table
+from utils.cache import cached
+from utils.watermark import data_version
+
+TREND_DTYPES = {'Impr': 'int64', 'Clicks': 'int64', 'Spend': 'float64', 'TCL': 'float64', 'AFS': 'float64'}
 
 # --- Get overall spend & tcl-revenue data for charts ---
 
-@st.cache_data(ttl=21600)
+@cached(version=data_version("campaign"))
 def fetch_overall_trend_data(start_date, end_date):
+    where_clause, params = report_where("campaign", start_date, end_date)
+    table = report_table("campaign", start_date, end_date)
+
     query = f"""
         SELECT
             bop.api_data_date AS Date,
             SUM(bop.bing_spend) AS Spend,
             SUM(bop.tcl_revenue) AS TCL
         FROM
-            bingads_optimizer_afs_campaign_performance_report bop
+            {table} bop
         WHERE
-            bop.api_data_date BETWEEN '{start_date}' AND '{end_date}'
+            {where_clause}
         GROUP BY
             bop.api_data_date
         ORDER BY
             bop.api_data_date ASC
     """
     
-    df_overall = run_query(query)
+    df_overall = run_query(query, params, source="reports", dtypes=TREND_DTYPES)
     
     return df_overall
+
+
+# --- Date x account series for the breakdown chart ---
+
+@cached(version=data_version("campaign"))
+def fetch_account_trend_data(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    where_clause, params = report_where("campaign", start_date, end_date, user_ids, campaign_names, account_id)
+    table = report_table("campaign", start_date, end_date, ["account"], user_ids, campaign_names, account_id)
+
+    query = f"""
+        SELECT
+            bop.api_data_date AS Date,
+            bop.bing_account_id AS Account,
+            SUM(bop.bing_impressions) AS Impr,
+            SUM(bop.pbt_adclick_count) AS Clicks,
+            SUM(bop.bing_spend) AS Spend,
+            SUM(bop.tcl_revenue) AS TCL,
+            SUM(bop.afs_estimated_earnings) AS AFS
+        FROM
+            {table} bop
+        WHERE
+            {where_clause}
+        GROUP BY
+            bop.api_data_date, bop.bing_account_id
+    """
+
+    return run_query(query, params, source="reports", dtypes=TREND_DTYPES)
@@ -1,22 +1,17 @@
-import streamlit as st
 from utils.db import run_query
+from utils.query_builder import report_where, report_table
+from utils.partitions import fetch_partitioned, filter_fingerprint
 
-# --- Get aggregated daily stats bases on users & campaign names ---
+DAILY_DTYPES = {
+    'Impr': 'int64', 'Clicks': 'int64', 'Spend': 'float64', 'TCL': 'float64', 'AFS': 'float64',
+    'PL_AFS': 'float64', 'PL_TCL': 'float64', 'ROI_AFS': 'float64', 'ROI_TCL': 'float64',
+}
 
-@st.cache_data(ttl=21600)
-def fetch_aggregated_daily_data(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
-    conditions = [f"bop.api_data_date BETWEEN '{start_date}' AND '{end_date}'"]
-    if account_id:
-        account_list = ','.join(map(str, account_id))
-        conditions.append(f"bop.bing_campaign_id IN ({account_list})")
-    if user_ids:
-        user_conditions = ','.join(map(str, user_ids))
-        conditions.append(f"bu.user_id IN ({user_conditions})")
-    if campaign_names:
-        campaign_list = "', '".join(campaign_names)
-        conditions.append(f"bop.bing_campaign_name IN ('{campaign_list}')")
+# --- Get aggregated daily stats bases on users & campaign names ---
 
-    where_clause = " AND ".join(conditions)
+def _fetch_daily_rows(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    where_clause, params = report_where("campaign", start_date, end_date, user_ids, campaign_names, account_id)
+    table = report_table("campaign", start_date, end_date, (), user_ids, campaign_names, account_id)
 
     query = f"""
         SELECT
@@ -31,14 +26,22 @@ def fetch_aggregated_daily_data(start_date, end_date, user_ids=None, campaign_na
             ROUND((SUM(bop.afs_estimated_earnings) - SUM(bop.bing_spend)) / NULLIF(SUM(bop.bing_spend), 0) * 100, 2) AS ROI_AFS,
             ROUND((SUM(bop.tcl_revenue) - SUM(bop.bing_spend)) / NULLIF(SUM(bop.bing_spend), 0) * 100, 2) AS ROI_TCL
         FROM
-            bingads_optimizer_afs_campaign_performance_report bop
-        JOIN
-            bingads_user_campaign_permission_relation_master bu
-            ON bop.bing_campaign_id = bu.campaign_id
+            {table} bop
         WHERE {where_clause}
         GROUP BY bop.api_data_date
-        ORDER BY bop.api_data_date DESC
     """
 
-    df = run_query(query)
-    return df
+    return run_query(query, params, source="reports", dtypes=DAILY_DTYPES)
+
+
+def fetch_aggregated_daily_data(start_date, end_date, user_ids=None, campaign_names=None, account_id=None):
+    df = fetch_partitioned(
+        "daily_stats",
+        filter_fingerprint(user_ids, campaign_names, account_id),
+        start_date,
+        end_date,
+        lambda range_start, range_end: _fetch_daily_rows(range_start, range_end, user_ids, campaign_names, account_id),
+    )
+    if df.empty:
+        return df
+    return df.sort_values('Date', ascending=False, ignore_index=True)
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from queries.campaign_stats import fetch_data
+from queries.daily_stats import fetch_aggregated_daily_data
+from queries.chart_data import fetch_overall_trend_data
+from queries.publishers_stats import fetch_filtered_publisher_report
+from queries.base_data import fetch_base_data, comparison_start, derive_period_totals, DEFAULT_COMPARISON
+from queries.kpi_totals import fetch_period_totals
+from utils.config import get_setting
+
+# --- The queries behind one dashboard page, shared by main.py and the cache warm-up ---
+
+# Sidebar quick filters: label -> number of days ending today
+QUICK_RANGES = {
+    "Last 7 Days": 7,
+    "Last 15 Days": 15,
+    "Last 30 Days": 30,
+    "Last 60 Days": 60,
+    "Last 90 Days": 90,
+}
+
+
+def quick_range(days, today):
+    return today - timedelta(days=days) + timedelta(days=1), today
+
+
+def previous_period(start_date, end_date):
+    period_length = (end_date - start_date).days + 1
+    prev_end_date = start_date - timedelta(days=1)
+    prev_start_date = prev_end_date - timedelta(days=period_length - 1)
+    return prev_start_date, prev_end_date
+
+
+def _totals_from_base(start_date, end_date):
+    # Single base fetch mode reads the base frame from comparison_start(); for ranges of up to about a
+    # month that reaches back over the whole previous period, so the KPI totals need no query of their own
+    if not get_setting("dashboard", "single_base_fetch", False):
+        return False
+    return comparison_start(start_date) <= previous_period(start_date, end_date)[0]
+
+
+def dashboard_tasks(start_date, end_date, filters, comparison=DEFAULT_COMPARISON, publisher_rules=()):
+    # {name: (fn, args)} for utils.concurrency.run_concurrently; none of them depend on each other
+    user_id_selection, campaign_name_selection, account_id_selection = filters
+    prev_start_date, prev_end_date = previous_period(start_date, end_date)
+    is_overall = not campaign_name_selection and not user_id_selection
+
+    tasks = {}
+    if not _totals_from_base(start_date, end_date):
+        tasks["totals"] = (fetch_period_totals, (start_date, end_date, prev_start_date, prev_end_date, *filters))
+    # In paged mode the publisher tab fetches one page at a time itself
+    if get_setting("dashboard", "publisher_mode", "full") != "paged":
+        tasks["publishers"] = (fetch_filtered_publisher_report, (start_date, end_date, *filters, publisher_rules))
+    # Single base fetch mode derives the campaign, daily and chart views from one date x campaign frame
+    if get_setting("dashboard", "single_base_fetch", False):
+        tasks["base"] = (fetch_base_data, (comparison_start(start_date), end_date, *filters))
+    else:
+        tasks["campaigns"] = (fetch_data, (start_date, end_date, *filters, comparison))
+        tasks["daily"] = (fetch_aggregated_daily_data, (start_date, end_date, *filters))
+        if is_overall:
+            tasks["trend"] = (fetch_overall_trend_data, (start_date, end_date))
+    return tasks
+
+
+def period_totals(results, start_date, end_date):
+    # The KPI totals from run_concurrently's results: the totals task's, or split from the base frame
+    if "totals" in results:
+        return results["totals"]
+    return derive_period_totals(results["base"], start_date, end_date, *previous_period(start_date, end_date))
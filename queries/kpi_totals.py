@@ -0,0 +1,47 @@
+from utils.db import run_query
+from utils.query_builder import report_where, report_table
+from queries.base_data import peek_base_data, derive_kpi_totals
+from utils.cache import cached
+from utils.watermark import data_version
+
+TOTAL_COLUMNS = ['Spend', 'TCL', 'AFS']
+
+# --- Current vs previous period totals for the KPI cards ---
+
+@cached(version=data_version("campaign"))
+def _query_period_totals(start_date, end_date, prev_start_date, prev_end_date, user_ids=None, campaign_names=None, account_id=None):
+    where_clause, params = report_where("campaign", prev_start_date, end_date, user_ids, campaign_names, account_id)
+    table = report_table("campaign", prev_start_date, end_date, (), user_ids, campaign_names, account_id)
+    params.update({"current_start": start_date, "current_end": end_date, "prev_start": prev_start_date, "prev_end": prev_end_date})
+
+    # One scan over both periods; conditional sums split them without window functions or per-row transfer
+    query = f"""
+        SELECT
+            SUM(CASE WHEN bop.api_data_date BETWEEN :current_start AND :current_end THEN bop.bing_spend ELSE 0 END) AS Spend,
+            SUM(CASE WHEN bop.api_data_date BETWEEN :current_start AND :current_end THEN bop.tcl_revenue ELSE 0 END) AS TCL,
+            SUM(CASE WHEN bop.api_data_date BETWEEN :current_start AND :current_end THEN bop.afs_estimated_earnings ELSE 0 END) AS AFS,
+            SUM(CASE WHEN bop.api_data_date BETWEEN :prev_start AND :prev_end THEN bop.bing_spend ELSE 0 END) AS Prev_Spend,
+            SUM(CASE WHEN bop.api_data_date BETWEEN :prev_start AND :prev_end THEN bop.tcl_revenue ELSE 0 END) AS Prev_TCL,
+            SUM(CASE WHEN bop.api_data_date BETWEEN :prev_start AND :prev_end THEN bop.afs_estimated_earnings ELSE 0 END) AS Prev_AFS
+        FROM
+            {table} bop
+        WHERE {where_clause}
+    """
+
+    df = run_query(query, params, source="reports")
+    if df.empty:
+        # The aggregate always returns a row, so no row means the query failed; None isn't cached
+        return None
+    row = df.iloc[0].fillna(0)
+    current = {col: float(row[col]) for col in TOTAL_COLUMNS}
+    previous = {col: float(row[f'Prev_{col}']) for col in TOTAL_COLUMNS}
+    return current, previous
+
+
+def fetch_period_totals(start_date, end_date, prev_start_date, prev_end_date, user_ids=None, campaign_names=None, account_id=None):
+    # Served from the cached base partitions when both periods are already loaded; None if the query failed
+    current = peek_base_data(start_date, end_date, user_ids, campaign_names, account_id)
+    previous = peek_base_data(prev_start_date, prev_end_date, user_ids, campaign_names, account_id)
+    if current is not None and previous is not None:
+        return derive_kpi_totals(current), derive_kpi_totals(previous)
+    return _query_period_totals(start_date, end_date, prev_start_date, prev_end_date, user_ids, campaign_names, account_id)
@@ -1,44 +1,152 @@
-import streamlit as st
-from utils.db import run_query
+import pandas as pd
+from utils.db import run_query, stream_query
+from utils.export import export_file
+from utils.query_builder import report_where, report_table
+from utils.partitions import fetch_partitioned, peek_partitioned, filter_fingerprint
+from utils.filters import filter_mask, having_clause
+from utils.cache import cached
+from utils.watermark import data_version
+
+# Columns the paged report can be ordered by (also whitelists what is interpolated into ORDER BY)
+PUBLISHER_SORT_COLUMNS = ['Spend', 'Revenue', 'PnL', 'ROI', 'Impr', 'Clicks', 'Date']
+
+# Column types of the report rows, whichever path fetched them (utils/db.py)
+PUBLISHER_DTYPES = {
+    'Impr': 'int64', 'Clicks': 'int64', 'Spend': 'float64', 'Revenue': 'float64', 'PnL': 'float64', 'ROI': 'float64',
+}
+
+# Column types of the exported report
+PUBLISHER_EXPORT_DTYPES = {
+    'Campaign': 'str', 'Ad Group': 'str', 'Publisher': 'str',
+    'Blocked (Ad Group)': 'Int64', 'Blocked (Campaign)': 'Int64', 'Impr': 'Int64', 'Clicks': 'Int64',
+    'Spend': 'float64', 'Revenue': 'float64', 'PnL': 'float64', 'ROI': 'float64',
+}
 
 # --- Get publishers' report ---
 
-@st.cache_data(ttl=21600)
-def fetch_publisher_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None):
-    
-    conditions = [f"a.api_data_date BETWEEN '{start_date}' AND '{end_date}'"]
-    if account_id:
-        account_list = ','.join(map(str, account_id))
-        conditions.append(f"a.account_id IN ({account_list})")
-    if user_id:
-        user_conditions = ','.join(map(str, user_id))
-        conditions.append(f"b.user_id IN ({user_conditions})")
-    if campaign_names:
-        campaign_list = "', '".join(campaign_names)
-        conditions.append(f"a.campaign_name IN ('{campaign_list}')")
-
-    where_clause = " AND ".join(conditions)
+def _publisher_query(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=()):
+    where_clause, params = report_where("publisher", start_date, end_date, user_id, campaign_names, account_id)
+    table = report_table("publisher", start_date, end_date, ["publisher"], user_id, campaign_names, account_id)
+    having = having_clause(rules, params)
     
     query = f"""
         select 
             a.api_data_date as Date, 
-            a.campaign_name as Campaign, 
-            a.ad_group_name as `Ad Group`, 
+            any_value(a.campaign_name) as Campaign, 
+            any_value(a.ad_group_name) as `Ad Group`, 
             a.final_main_domain as Publisher, 
-            a.blocked_at_ad_group as `Blocked (Ad Group)`, 
-            a.blocked_at_campaign as `Blocked (Campaign)`, 
+            any_value(a.blocked_at_ad_group) as `Blocked (Ad Group)`, 
+            any_value(a.blocked_at_campaign) as `Blocked (Campaign)`, 
             sum(a.bing_impression) as Impr, 
             sum(a.pbt_adclick_count) as Clicks, 
             round(sum(a.bing_spend), 2) as Spend, 
             round(sum(a.tcl_revenue), 2) as Revenue, 
             round((sum(a.tcl_revenue)-sum(a.bing_spend)), 2) as PnL, 
             round(((sum(a.tcl_revenue)-sum(a.bing_spend))/sum(a.bing_spend))*100, 2) as ROI 
-        from bingads_optimizer_afs_pub_report a
-        join bingads_user_campaign_permission_relation_master b 
-        on a.campaign_id = b.campaign_id 
+        from {table} a
         where {where_clause}
         group by a.api_data_date, a.final_main_domain 
-        order by a.api_data_date desc
+        {having}
     """
-    df_publisher = run_query(query)
-    return df_publisher
+    return query, params
+
+
+def _fetch_publisher_rows(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=()):
+    query, params = _publisher_query(start_date, end_date, user_id, campaign_names, account_id, rules)
+    return run_query(query, params, source="reports", dtypes=PUBLISHER_DTYPES)
+
+
+def _publisher_fingerprint(user_id, campaign_names, account_id, rules=()):
+    if rules:
+        return filter_fingerprint(user_id, campaign_names, account_id, rules)
+    return filter_fingerprint(user_id, campaign_names, account_id)
+
+
+def fetch_publisher_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=()):
+    # `rules` (see utils/filters.py) are pushed down as a HAVING clause. Filters only drop whole
+    # date x publisher rows, so filtered results are partitioned by day like unfiltered ones.
+    df_publisher = fetch_partitioned(
+        "publishers_stats",
+        _publisher_fingerprint(user_id, campaign_names, account_id, rules),
+        start_date,
+        end_date,
+        lambda range_start, range_end: _fetch_publisher_rows(range_start, range_end, user_id, campaign_names, account_id, rules),
+        report="publisher",
+    )
+    if df_publisher.empty:
+        return df_publisher
+    return df_publisher.sort_values('Date', ascending=False, kind='stable', ignore_index=True)
+
+
+def fetch_filtered_publisher_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=()):
+    # Mask locally when the unfiltered report is already cached; otherwise push the filters into SQL
+    # so only matching rows are transferred
+    unfiltered = peek_partitioned("publishers_stats", _publisher_fingerprint(user_id, campaign_names, account_id), start_date, end_date, report="publisher")
+    if unfiltered is None or not rules:
+        return fetch_publisher_report(start_date, end_date, user_id, campaign_names, account_id, rules)
+    if unfiltered.empty:
+        return unfiltered
+    unfiltered = unfiltered.sort_values('Date', ascending=False, kind='stable', ignore_index=True)
+    return unfiltered[filter_mask(unfiltered, rules)].reset_index(drop=True)
+
+
+def export_publisher_report(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=(), fmt="CSV"):
+    # Every matching date x publisher row, streamed into a file (utils/export.py) chunk by chunk
+    query, params = _publisher_query(start_date, end_date, user_id, campaign_names, account_id, rules)
+    chunks = stream_query(f"{query} order by Date desc, Publisher", params, source="reports")
+    return export_file(chunks, fmt, PUBLISHER_EXPORT_DTYPES)
+
+
+# --- Paged / top-N publishers' report ---
+
+@cached(version=data_version("publisher"))
+def fetch_publisher_summary(start_date, end_date, user_id=None, campaign_names=None, account_id=None, rules=()):
+    # Row count and total spend for the header line, without transferring the rows. None if the query
+    # failed (the count always returns a row), which @cached doesn't store.
+    query, params = _publisher_query(start_date, end_date, user_id, campaign_names, account_id, rules)
+    df = run_query(f"select count(*) as Publishers, sum(p.Spend) as Spend from ({query}) p", params, source="reports")
+    if df.empty:
+        return None
+    return int(df['Publishers'].iloc[0]), float(df['Spend'].fillna(0).iloc[0])
+
+
+@cached(version=data_version("publisher"))
+def fetch_publisher_page(start_date, end_date, user_id=None, campaign_names=None, account_id=None,
+                         sort_by='Spend', descending=True, page_size=100, after=None, rules=()):
+    # Keyset pagination on (sort column, Date, Publisher); `after` is the key of the previous page's last row.
+    # The first page is the top-N by the sort column.
+    if sort_by not in PUBLISHER_SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort_by}")
+
+    query, params = _publisher_query(start_date, end_date, user_id, campaign_names, account_id, rules)
+    # NULL metrics (ROI with no spend) sort as 0; Date is never NULL and is compared as a date
+    sort_key = f"coalesce(p.{sort_by}, 0)" if sort_by in PUBLISHER_DTYPES else f"p.{sort_by}"
+    key_columns = [sort_key] + [f"p.{col}" for col in ['Date', 'Publisher'] if col != sort_by]
+    direction = "desc" if descending else "asc"
+
+    keyset = ""
+    if after is not None:
+        placeholders = []
+        for i, value in enumerate(after):
+            params[f"after_{i}"] = value
+            placeholders.append(f":after_{i}")
+        keyset = f"where ({', '.join(key_columns)}) {'<' if descending else '>'} ({', '.join(placeholders)})"
+
+    params["page_size"] = page_size
+    page_query = f"""
+        select p.*, {key_columns[0]} as sort_key
+        from ({query}) p
+        {keyset}
+        order by {', '.join(f'{col} {direction}' for col in key_columns)}
+        limit :page_size
+    """
+    return run_query(page_query, params, source="reports", dtypes=PUBLISHER_DTYPES)
+
+
+def page_cursor(df_page, sort_by):
+    # Keyset of the last row on a page, in the same order as fetch_publisher_page's key columns
+    last = df_page.iloc[-1]
+    values = [last['sort_key']] + [last[col] for col in ['Date', 'Publisher'] if col != sort_by]
+    # numpy/pandas scalars can't be bound by the DB driver
+    values = [value.date() if isinstance(value, pd.Timestamp) else value.item() if hasattr(value, 'item') else value for value in values]
+    return tuple(values)
@@ -1,10 +1,10 @@
-import streamlit as st
 from utils.db import run_query
+from utils.cache import cached
 
 # --- Caching functions to improve performance ---
 
-@st.cache_data(ttl=21600)
+@cached(ttl=21600)
 def fetch_user_mapping():
     query = "select distinct id, name from users order by name asc"
-    df = run_query(query)
+    df = run_query(query, source="reports")
     return df.set_index('name')['id'].to_dict()
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from utils.cache import compact_frame
+from utils.filters import filter_mask
+
+# --- Compacted results keep exact cent values for the publisher filters and totals ---
+
+
+def _report(spend, roi):
+    # Shaped like a publisher report as returned by the database, before compaction
+    return compact_frame(pd.DataFrame({'Publisher': [f"site{i}.example.com" for i in range(len(spend))], 'Spend': spend, 'ROI': roi}))
+
+
+def test_filters_match_cent_boundaries():
+    df = _report([50.1, 50.09, 50.11, 12.34], [-30.01, -30.0, -30.02, 15.5])
+
+    assert filter_mask(df, [('Spend', '=', 50.1)]).tolist() == [True, False, False, False]
+    assert filter_mask(df, [('Spend', '>=', 50.1)]).tolist() == [True, False, True, False]
+    assert filter_mask(df, [('Spend', '<', 50.1)]).tolist() == [False, True, False, True]
+    assert filter_mask(df, [('ROI', '<=', -30.01)]).tolist() == [True, False, True, False]
+
+
+def test_totals_stay_exact_to_the_cent():
+    cents = np.random.default_rng(0).integers(1, 10_000, 1_000_000)
+    df = _report(cents / 100, np.zeros(len(cents)))
+
+    assert df['Spend'].dtype == np.float64
+    assert round(df['Spend'].sum(), 2) == cents.sum() / 100
@@ -0,0 +1,184 @@
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.config import get_setting
+from utils.metrics import record_event
+from utils.selection import Selection
+from utils.disk_cache import SharedDiskCache, TieredCache
+
+# --- Byte-budgeted result cache ---
+# One process-wide LRU for query results and day partitions, bounded by the memory their frames
+# actually use (`cache.max_mb`) rather than by entry count, so the server's RSS stays flat.
+
+# Low-cardinality text columns stored as categoricals
+CATEGORY_COLUMNS = ['Campaign', 'Publisher', 'Ad Group']
+
+# Keyset cursor values (queries/publishers_stats.py) are bound back into SQL and compared with
+# the database's own values, so they keep the precision they were returned with
+EXACT_COLUMNS = ['sort_key']
+
+
+def result_nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(result_nbytes(k) + result_nbytes(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class ByteBudgetCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+    def get(self, key, max_age=None, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            stored_at, nbytes, value = entry
+            if max_age is not None and time.time() - stored_at > max_age:
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, stored_at=None):
+        nbytes = result_nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            if nbytes > self.max_bytes:
+                # Larger than the whole budget: serve it this once, keep nothing
+                return
+            self._entries[key] = (stored_at or time.time(), nbytes, value)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, evicted_bytes, _) = self._entries.popitem(last=False)
+                self._nbytes -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._nbytes, "max_bytes": self.max_bytes}
+
+
+@st.cache_resource
+def get_result_cache():
+    memory = ByteBudgetCache(int(get_setting("cache", "max_mb", 1024) * 2 ** 20))
+    shared_path = get_setting("shared_cache", "path")
+    if not shared_path:
+        return memory
+    # Frames are also kept in a directory shared with the other processes and replicas
+    disk = SharedDiskCache(shared_path, int(get_setting("shared_cache", "max_mb", 4096) * 2 ** 20),
+                           get_setting("shared_cache", "sweep_interval", 60))
+    return TieredCache(memory, disk)
+
+
+# --- Cached query functions ---
+
+_MISSING = object()
+
+def _freeze(value):
+    # Hashable stand-in for an argument: selections by fingerprint, lists/dicts as tuples
+    if isinstance(value, Selection):
+        return ("selection", value.fingerprint)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def cached(ttl=None, version=None):
+    # Drop-in for @st.cache_data(ttl=...), backed by the byte-budgeted cache. Frames are returned
+    # without copying; copy-on-write keeps callers from modifying the cached one. `version` returns
+    # a token that is part of the key, e.g. utils.watermark.data_version(report): a new token
+    # orphans the old entries, which the LRU then evicts.
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (name, _freeze(args), _freeze(kwargs), version() if version else None)
+            cache = get_result_cache()
+            started = time.perf_counter()
+            result = cache.get(key, ttl, _MISSING)
+            if result is not _MISSING:
+                record_event("cache", fn.__name__, time.perf_counter() - started, cache="hit")
+                return result
+            result = fn(*args, **kwargs)
+            if result is not None and not (isinstance(result, pd.DataFrame) and result.columns.empty):
+                # None or a frame without columns is a failed query; retried on the next call
+                cache.put(key, result)
+            record_event("cache", fn.__name__, time.perf_counter() - started, cache="miss")
+            return result
+
+        return wrapper
+    return decorator
+
+
+# --- Compact dtypes for stored results ---
+
+def cast_frame(df, dtypes):
+    # Explicit column types ({column: pandas dtype}) of a queries/ result. MySQL returns SUM()s as
+    # Decimal objects; numeric targets are parsed first. A plain integer column holding NULLs
+    # stays float rather than failing.
+    columns = {}
+    for col, dtype in dtypes.items():
+        if col not in df:
+            continue
+        values = df[col]
+        target = pd.api.types.pandas_dtype(dtype)
+        if pd.api.types.is_numeric_dtype(target) and not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values)
+        if isinstance(target, np.dtype) and target.kind in "iu" and values.isna().any():
+            target = np.dtype(np.float64)
+        if values.dtype != target:
+            columns[col] = values.astype(target)
+        elif values is not df[col]:
+            columns[col] = values
+    return df.assign(**columns) if columns else df
+
+
+def compact_frame(df):
+    if df.empty:
+        return df
+    columns = {}
+    for col in df.columns:
+        if col in EXACT_COLUMNS:
+            continue
+        values = df[col]
+        if values.dtype == object:
+            kind = pd.api.types.infer_dtype(values, skipna=True)
+            if col in CATEGORY_COLUMNS and kind == "string":
+                columns[col] = values.astype("category")
+                continue
+            if kind not in ("decimal", "integer", "floating", "mixed-integer-float"):
+                continue
+            # MySQL returns SUM()s as Decimal objects
+            values = pd.to_numeric(values)
+        elif col in CATEGORY_COLUMNS and pd.api.types.is_string_dtype(values):
+            columns[col] = values.astype("category")
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            columns[col] = pd.to_numeric(values, downcast="integer")
+        elif values is not df[col]:
+            # Floats stay float64: the metrics are filtered on exact cent values and summed into totals
+            columns[col] = values
+    return df.assign(**columns) if columns else df
@@ -0,0 +1,26 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from utils.config import get_setting
+
+# --- Run independent queries side by side on a shared worker pool ---
+
+@st.cache_resource
+def get_query_executor():
+    # Keep this at or below the connection pool size so workers never queue on the pool
+    return ThreadPoolExecutor(max_workers=get_setting("pool", "query_workers", 8), thread_name_prefix="query")
+
+
+# tasks maps a name to (fn, args); returns {name: result} once every task has finished
+def run_concurrently(tasks):
+    ctx = get_script_run_ctx()
+
+    def call(fn, args):
+        # Lets st.* calls (errors, caches) inside the worker attach to the calling session
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    executor = get_query_executor()
+    futures = {name: executor.submit(call, fn, args) for name, (fn, args) in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,14 @@
+import os
+import streamlit as st
+import toml
+
+# --- config.toml is read once per process instead of on every query ---
+
+@st.cache_resource
+def load_config():
+    # DASHBOARD_CONFIG points the app (or the benchmarks) at another config file
+    return toml.load(os.environ.get("DASHBOARD_CONFIG", "config.toml"))
+
+
+def get_setting(section, key, default=None):
+    return load_config().get(section, {}).get(key, default)
@@ -1,19 +1,228 @@
+import logging
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import quote
 import pandas as pd
+import pyarrow as pa
 import sqlalchemy
 import streamlit as st
-import toml
+from sqlalchemy.dialects import mysql
+from utils.config import load_config, get_setting
+from utils.mirror import mirror_enabled, get_mirror_engine, to_mirror_sql
+from utils.metrics import metrics_enabled, record_event, frame_stats
+from utils.cache import compact_frame, cast_frame, get_result_cache
+from utils.singleflight import get_query_flights
+
+try:
+    import connectorx
+except ImportError:
+    connectorx = None
+
+_log = logging.getLogger(__name__)
+
+# mysql-connector's prepared cursors only accept positional %s placeholders
+_PREPARED_DIALECT = mysql.dialect(paramstyle="format")
+# Renders bound values inline for connectorx, which takes no parameters; qmark leaves % unescaped
+_LITERAL_DIALECT = mysql.dialect(paramstyle="qmark")
+
+
+# --- One pooled engine per process, shared by every session and rerun ---
 
 @st.cache_resource
-def run_query(query):
-    config = toml.load("config.toml")["database"]
-    engine = None
+def get_engine():
+    config = load_config()["database"]
+    pool = load_config().get("pool", {})
+    url = sqlalchemy.engine.URL.create(
+        "mysql+mysqlconnector",
+        username=config["user"],
+        password=config["password"],
+        host=config["host"],
+        port=config.get("port"),
+        database=config["database"],
+    )
+    return sqlalchemy.create_engine(
+        url,
+        pool_size=pool.get("size", 10),
+        max_overflow=pool.get("max_overflow", 20),
+        pool_timeout=pool.get("timeout", 30),
+        pool_recycle=pool.get("recycle", 1800),
+        pool_pre_ping=pool.get("pre_ping", True),
+        query_cache_size=pool.get("statement_cache_size", 500),
+    )
+
+
+def _bind(query, params):
+    # Lists/tuples become expanding bind params, so `col IN :ids` renders one placeholder per value
+    bound = []
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            bound.append(sqlalchemy.bindparam(name, value=list(value), expanding=True))
+        else:
+            bound.append(sqlalchemy.bindparam(name, value=value))
+    return sqlalchemy.text(query).bindparams(*bound)
+
+
+def _compile(query, params, dialect):
+    # SQL string and DBAPI arguments for a raw cursor, with IN lists expanded
+    compiled = _bind(query, params).compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    if compiled.positional:
+        return compiled.string, tuple(compiled.params[name] for name in compiled.positiontup)
+    return compiled.string, compiled.params
+
+
+def _run_prepared(query, params):
+    sql, args = _compile(query, params, _PREPARED_DIALECT)
+
+    connection = get_engine().raw_connection()
+    try:
+        # Prepared cursors live as long as the pooled DBAPI connection, so reruns reuse the server-side
+        # statement. Each IN-list length is its own statement, so only the most recently used are kept
+        # open; the others are closed, which deallocates them on the server (max_prepared_stmt_count).
+        statements = connection.info.setdefault("prepared_statements", OrderedDict())
+        cursor = statements.get(sql)
+        if cursor is None:
+            cursor = connection.cursor(prepared=True)
+            statements[sql] = cursor
+            while len(statements) > get_setting("pool", "prepared_cache_size", 32):
+                _, evicted = statements.popitem(last=False)
+                evicted.close()
+        else:
+            statements.move_to_end(sql)
+        cursor.execute(sql, args)
+        return pd.DataFrame(cursor.fetchall(), columns=cursor.column_names)
+    finally:
+        connection.close()
+
+
+# --- Columnar result path ---
+# Result sets are decoded straight into Arrow column buffers, batch by batch, instead of one Python
+# tuple per row: DuckDB hands them over natively, MySQL goes through connectorx when installed.
+# Decimal columns (MySQL SUMs) are cast to float64 in Arrow before pandas sees them.
+
+def arrow_enabled():
+    return get_setting("pool", "arrow_results", False)
+
+
+def _connectorx_uri():
+    config = load_config()["database"]
+    port = f":{config['port']}" if config.get("port") else ""
+    return f"mysql://{quote(config['user'], safe='')}:{quote(config['password'], safe='')}@{config['host']}{port}/{config['database']}"
+
+
+def _fetch_arrow(query, params, source):
+    # An Arrow table of the result, or None where no columnar reader is available
+    batch_rows = get_setting("pool", "arrow_batch_rows", 65536)
+    if source == "reports" and mirror_enabled():
+        sql, args = _compile(to_mirror_sql(query), params, get_mirror_engine().dialect)
+        connection = get_mirror_engine().raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, args)
+            return cursor.fetch_record_batch(batch_rows).read_all()
+        finally:
+            connection.close()
+    if connectorx is None:
+        return None
+    sql = str(_bind(query, params).compile(dialect=_LITERAL_DIALECT, compile_kwargs={"render_postcompile": True, "literal_binds": True}))
+    return connectorx.read_sql(_connectorx_uri(), sql, return_type="arrow_stream", batch_size=batch_rows).read_all()
+
+
+def _arrow_to_frame(table):
+    fields = [pa.field(field.name, pa.float64()) if pa.types.is_decimal(field.type) else field for field in table.schema]
+    table = table.cast(pa.schema(fields))
+    # split_blocks/self_destruct let pandas take over the column buffers without a consolidating copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _execute(query, params, source):
+    if arrow_enabled():
+        try:
+            table = _fetch_arrow(query, params, source)
+            if table is not None:
+                return _arrow_to_frame(table)
+        except Exception as e:
+            # The row-based path below reports the error if the query itself is at fault
+            _log.warning("Arrow fetch failed, falling back to rows: %s", e)
+    if source == "reports" and mirror_enabled():
+        with get_mirror_engine().connect() as conn:
+            return pd.read_sql(_bind(to_mirror_sql(query), params), conn)
+    if get_setting("pool", "prepared_statements", False):
+        return _run_prepared(query, params)
+    with get_engine().connect() as conn:
+        return pd.read_sql(_bind(query, params), conn)
+
+
+def _query_fingerprint(query, params, source, dtypes):
+    # Whitespace-insensitive SQL with its parameters: the same query from any session matches
+    frozen = tuple(sorted((name, tuple(value) if isinstance(value, (list, tuple)) else value) for name, value in params.items()))
+    return source, " ".join(query.split()), frozen, tuple(sorted((dtypes or {}).items()))
+
+
+def _fetch(query, params, source, dtypes):
+    df = _execute(query, params, source)
+    return compact_frame(cast_frame(df, dtypes) if dtypes else df)
+
+
+def run_query(query, params=None, source="mysql", dtypes=None):
+    # source="reports" marks queries that only touch mirrored tables; they use the local mirror when enabled.
+    # dtypes ({column: pandas dtype}) pins the result's column types, the same on either fetch path.
+    # Results are not cached here: the queries/ functions cache them (utils/cache.py, utils/partitions.py),
+    # so each result is held once, in compact dtypes, under the shared memory budget.
+    params = params or {}
+    started = time.perf_counter()
+    coalesced = False
     try:
-        engine = sqlalchemy.create_engine(
-            f"mysql+mysqlconnector://{config['user']}:{config['password']}@{config['host']}/{config['database']}"
-        )
-        df = pd.read_sql(query, engine)
-        return df
+        if get_setting("pool", "coalesce_queries", True):
+            # Sessions missing the cache at the same moment wait on one execution of the query
+            # instead of each sending it (utils/singleflight.py); an error reaches every one of them
+            df, coalesced = get_query_flights().do(_query_fingerprint(query, params, source, dtypes),
+                                                   lambda: _fetch(query, params, source, dtypes))
+        else:
+            df = _fetch(query, params, source, dtypes)
     except Exception as e:
         #print(f"An error occurred: {e}")
         st.error(f"❌ Database query failed: {e}")
-        #return pd.DataFrame()
+        df = pd.DataFrame()
+    if metrics_enabled():
+        # Named after the queries/ function that issued it
+        caller = sys._getframe(1).f_code.co_name
+        record_event("query", caller, time.perf_counter() - started, source=source, coalesced=coalesced, **frame_stats(df))
+    return df
+
+
+def stream_query(query, params=None, source="mysql", chunk_rows=None):
+    # Yields the result in DataFrames of at most chunk_rows rows, read from an unbuffered cursor so
+    # neither the driver nor pandas ever holds more than one chunk. Not cached and not compacted:
+    # every chunk keeps the driver's types, so the chunks can be appended to one file.
+    params = params or {}
+    chunk_rows = chunk_rows or get_setting("export", "chunk_rows", 50000)
+    if source == "reports" and mirror_enabled():
+        engine, query = get_mirror_engine(), to_mirror_sql(query)
+    else:
+        engine = get_engine()
+    sql, args = _compile(query, params, engine.dialect)
+
+    started = time.perf_counter()
+    rows_read = 0
+    finished = False
+    connection = engine.raw_connection()
+    try:
+        # SQLAlchemy's stream_results is off for mysql-connector, so the unbuffered cursor is asked for directly
+        cursor = connection.cursor(buffered=False) if engine.dialect.name == "mysql" else connection.cursor()
+        cursor.execute(sql, args)
+        columns = [column[0] for column in cursor.description]
+        while rows := cursor.fetchmany(chunk_rows):
+            rows_read += len(rows)
+            yield pd.DataFrame(rows, columns=columns)
+        finished = True
+    finally:
+        if not finished:
+            # Rows left unread on the wire make the connection unusable for the next checkout
+            connection.invalidate()
+        connection.close()
+        record_event("query", "stream_query", time.perf_counter() - started, source=source, rows=rows_read, finished=finished)
+
+
+def clear_query_cache():
+    get_result_cache().clear()
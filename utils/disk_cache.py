@@ -0,0 +1,188 @@
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+
+# --- Result cache shared by every process and replica through a volume ---
+# DataFrame results are written as Arrow IPC files named by a fingerprint of their cache key, so
+# any dashboard process that mounts the volume can read what another one computed. Files are
+# written under a temporary name and renamed into place (readers never see half a file), read
+# through a memory map, and evicted oldest-access-first once the directory exceeds its budget.
+# Other values (totals, name lists, the campaign dimension) stay in the process's own cache.
+
+# Part of every fingerprint; bump it when the stored layout changes
+_FORMAT = 2
+
+# The code that shapes the stored frames: the queries' SQL and columns, and the compaction and routing
+# in utils/. Its hash is part of every fingerprint too, so after a deploy that changes it, entries
+# written by the old code (possibly with other columns) are never served; the sweep evicts them.
+_CODE_DIRS = ("queries", "utils")
+
+# Leftover temporary files from a writer that died are removed after this many seconds
+_STALE_TMP_SECONDS = 3600
+
+_MISSING = object()
+
+_log = logging.getLogger(__name__)
+
+
+@functools.cache
+def code_version():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for directory in _CODE_DIRS:
+        for name in sorted(os.listdir(os.path.join(root, directory))):
+            if name.endswith(".py"):
+                with open(os.path.join(root, directory, name), "rb") as file:
+                    digest.update(name.encode() + b"\0" + file.read())
+    return digest.hexdigest()[:16]
+
+
+def key_fingerprint(key):
+    # Cache keys are tuples of names, dates, strings and numbers (selections are frozen to their
+    # fingerprints by utils.cache), whose repr is the same in every process
+    return hashlib.sha256(repr((_FORMAT, code_version(), key)).encode()).hexdigest()
+
+
+class SharedDiskCache:
+    def __init__(self, path, max_bytes, sweep_interval=60):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, fingerprint):
+        return os.path.join(self.path, fingerprint[:2], f"{fingerprint}.arrow")
+
+    def get(self, key, max_age=None):
+        # (time it was stored, frame), or None
+        path = self._file(key_fingerprint(key))
+        try:
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        stored_at = float((table.schema.metadata or {}).get(b"stored_at", 0))
+        if max_age is not None and time.time() - stored_at > max_age:
+            return None
+        try:
+            # The access time for eviction is the file's mtime (atime is often not kept)
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return stored_at, table.to_pandas(split_blocks=True)
+
+    def put(self, key, df):
+        path = self._file(key_fingerprint(key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"stored_at": str(time.time()).encode()})
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file, pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._maybe_sweep()
+
+    def _entries(self):
+        for directory in os.scandir(self.path):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                try:
+                    yield entry, entry.stat()
+                except FileNotFoundError:
+                    continue
+
+    def _maybe_sweep(self):
+        with self._lock:
+            if time.time() - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = time.time()
+        self.sweep()
+
+    def sweep(self):
+        # Deletes the least recently used files until the directory is back under 90% of its budget.
+        # Several processes may sweep at once; a file already removed by another one is skipped.
+        now = time.time()
+        files = []
+        for entry, stat in self._entries():
+            if entry.name.endswith(".tmp"):
+                if now - stat.st_mtime > _STALE_TMP_SECONDS:
+                    self._remove(entry.path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes * 0.9:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry, _ in list(self._entries()):
+            self._remove(entry.path)
+
+    def stats(self):
+        sizes = [stat.st_size for entry, stat in self._entries() if entry.name.endswith(".arrow")]
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+
+class TieredCache:
+    # The process's byte-budgeted LRU in front of the shared directory; same interface as
+    # utils.cache.ByteBudgetCache, so the cached queries and partitions use it unchanged
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, max_age=None, default=None):
+        value = self.memory.get(key, max_age, _MISSING)
+        if value is not _MISSING:
+            return value
+        try:
+            found = self.disk.get(key, max_age)
+        except Exception as e:
+            _log.warning("Shared cache read failed: %s", e)
+            found = None
+        if found is None:
+            return default
+        stored_at, value = found
+        # Keeps the age it had on disk, so a TTL counts from when it was first computed
+        self.memory.put(key, value, stored_at)
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if isinstance(value, pd.DataFrame):
+            try:
+                self.disk.put(key, value)
+            except Exception as e:
+                # The result is still served and cached in this process
+                _log.warning("Shared cache write failed: %s", e)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["shared"] = self.disk.stats()
+        return stats
+
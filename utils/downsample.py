@@ -0,0 +1,39 @@
+import numpy as np
+
+# --- Largest-Triangle-Three-Buckets downsampling for line charts ---
+# Keeps the first and last point and, from each bucket in between, the point forming the largest
+# triangle with the previously kept point and the next bucket's average, so peaks and dips survive.
+
+
+def lttb(x, y, threshold):
+    # Indices of the points to keep; x must be sorted and numeric (datetimes as int64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample_frame(df, x_column, y_columns, threshold):
+    # Rows kept by LTTB on each y column, merged; df must be sorted by x_column
+    if len(df) <= threshold:
+        return df
+    x = df[x_column].to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    keep = np.unique(np.concatenate([lttb(x, df[col].to_numpy(dtype=float, na_value=np.nan), threshold) for col in y_columns]))
+    return df.iloc[keep]
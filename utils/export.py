@@ -0,0 +1,53 @@
+import tempfile
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.cache import cast_frame
+
+# --- Chunked CSV / Parquet export ---
+# Reports are exported from utils.db.stream_query's chunks into a temporary file, one chunk at a
+# time, so only a single chunk is ever held as a DataFrame however many rows are exported.
+# Streamlit's download button serves bytes from memory, so the encoded file itself is read back whole.
+
+# Label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _write_csv(chunks, file):
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(file, header=i == 0, index=False, encoding="utf-8")
+
+
+def _write_parquet(chunks, file):
+    # One row group per chunk, all with the first chunk's schema
+    writer = schema = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                schema = table.schema
+                writer = pq.ParquetWriter(file, schema, compression="zstd")
+            else:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_file(chunks, fmt, dtypes=None):
+    # The exported file's bytes, as st.download_button takes them. Rows are encoded one chunk at a
+    # time through a temporary file, so only one chunk is held as a DataFrame; the finished file is
+    # then held once while Streamlit serves it.
+    if dtypes:
+        # Every chunk gets the same column types, or a chunk of NULLs would be typed differently
+        chunks = (cast_frame(chunk, dtypes) for chunk in chunks)
+    with tempfile.TemporaryFile() as file:
+        if fmt == "Parquet":
+            _write_parquet(chunks, file)
+        else:
+            _write_csv(chunks, file)
+        file.seek(0)
+        return file.read()
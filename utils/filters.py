@@ -0,0 +1,50 @@
+import operator
+import numpy as np
+
+# --- Advanced publisher filters compiled into one predicate ---
+# A rule is (metric, operator, value). The same rules run locally as one vectorized mask or
+# remotely as a HAVING clause, so the tab doesn't have to download rows it will throw away.
+
+FILTER_METRICS = ['Spend', 'Clicks', 'Impr', 'ROI']
+FILTER_OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '=': operator.eq,
+}
+
+# Aggregate each metric is computed from in the publisher report
+_HAVING_EXPRESSIONS = {
+    'Spend': "round(sum(a.bing_spend), 2)",
+    'Clicks': "sum(a.pbt_adclick_count)",
+    'Impr': "sum(a.bing_impression)",
+    'ROI': "round(((sum(a.tcl_revenue)-sum(a.bing_spend))/sum(a.bing_spend))*100, 2)",
+}
+
+
+def compile_filters(rows):
+    # Drops incomplete rows and returns a hashable, order-stable tuple usable as a cache key
+    return tuple(
+        (metric, op, float(value))
+        for metric, op, value in rows
+        if metric in FILTER_METRICS and op in FILTER_OPERATORS and value is not None
+    )
+
+
+def filter_mask(df, rules):
+    if not rules or df.empty:
+        return np.ones(len(df), dtype=bool)
+    masks = [FILTER_OPERATORS[op](df[metric].to_numpy(dtype=float), value) for metric, op, value in rules]
+    return np.logical_and.reduce(masks)
+
+
+def having_clause(rules, params):
+    # Values are bound, never interpolated; metric and operator come from the whitelists above
+    if not rules:
+        return ""
+    predicates = []
+    for i, (metric, op, value) in enumerate(rules):
+        params[f"filter_{i}"] = value
+        predicates.append(f"{_HAVING_EXPRESSIONS[metric]} {op} :filter_{i}")
+    return "having " + " and ".join(predicates)
@@ -0,0 +1,157 @@
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.config import get_setting
+
+# --- Per-rerun instrumentation of queries and renders ---
+# Every run_query call and render_* component records an event (latency, rows, DataFrame memory,
+# cache hit/miss) against the current session's rerun. Events are shown by the sidebar debug panel
+# (components/debug_panel.py), logged as JSON lines, and summed into a Prometheus text file.
+
+_logger = logging.getLogger("dashboard.metrics")
+
+# Sessions whose last rerun is kept for the debug panel; the least recently rerun ones (mostly closed
+# tabs) are dropped first. A rerun keeps at most this many events.
+_MAX_SESSIONS = 200
+_MAX_RERUN_EVENTS = 2000
+
+
+def metrics_enabled():
+    return get_setting("metrics", "enabled", False)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reruns = OrderedDict()
+        # Process-wide totals for the Prometheus file: (metric, labels) -> value
+        self._totals = {}
+
+    def begin_rerun(self, session_id):
+        with self._lock:
+            self._reruns[session_id] = []
+            self._reruns.move_to_end(session_id)
+            while len(self._reruns) > _MAX_SESSIONS:
+                self._reruns.popitem(last=False)
+
+    def record(self, session_id, event):
+        with self._lock:
+            # Threads without a session (the cache warm-up) only count towards the totals
+            events = self._reruns.get(session_id) if session_id else None
+            if events is not None and len(events) < _MAX_RERUN_EVENTS:
+                events.append(event)
+            labels = (("kind", event["kind"]), ("name", event["name"]), ("cache", event.get("cache", "")))
+            for metric, value in (("count", 1), ("seconds", event["seconds"]), ("rows", event.get("rows") or 0)):
+                self._totals[(metric, labels)] = self._totals.get((metric, labels), 0) + value
+
+    def events(self, session_id):
+        with self._lock:
+            return list(self._reruns.get(session_id, []))
+
+    def prometheus_text(self):
+        with self._lock:
+            totals = dict(self._totals)
+        lines = []
+        for metric, help_text in (
+            ("count", "Calls by kind (query/render) and name"),
+            ("seconds", "Wall-clock seconds spent, summed"),
+            ("rows", "Rows returned, summed"),
+        ):
+            name = f"dashboard_{metric}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (total_metric, labels), value in sorted(totals.items()):
+                if total_metric == metric:
+                    label_text = ",".join(f'{key}="{value_}"' for key, value_ in labels if value_)
+                    lines.append(f"{name}{{{label_text}}} {value:.6g}")
+        return "\n".join(lines) + "\n"
+
+
+@st.cache_resource
+def get_metrics_registry():
+    return MetricsRegistry()
+
+
+def _session_id():
+    # Query workers carry the session's script context (utils/concurrency.py), so their events land in the same rerun
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else ""
+
+
+def _json_logger():
+    log_file = get_setting("metrics", "log_file")
+    if log_file and not _logger.handlers:
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger.addHandler(handler)
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+    return _logger
+
+
+def record_event(kind, name, seconds, **fields):
+    if not metrics_enabled():
+        return
+    event = {"ts": round(time.time(), 3), "kind": kind, "name": name, "seconds": round(seconds, 6), **fields}
+    session_id = _session_id()
+    get_metrics_registry().record(session_id, event)
+    _json_logger().info(json.dumps({"session": session_id, **event}, default=str))
+
+
+def frame_stats(df):
+    # Rows and in-memory size of a result; deep=True so string columns are counted at their real size
+    if df is None or not hasattr(df, "memory_usage"):
+        return {"rows": None, "memory_bytes": None}
+    return {"rows": len(df), "memory_bytes": int(df.memory_usage(index=True, deep=True).sum())}
+
+
+@contextmanager
+def timed(kind, name, **fields):
+    started = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record_event(kind, name, time.perf_counter() - started, **fields)
+
+
+def timed_render(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not metrics_enabled():
+            return fn(*args, **kwargs)
+        with timed("render", fn.__name__):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def begin_rerun():
+    if metrics_enabled():
+        get_metrics_registry().begin_rerun(_session_id())
+
+
+def rerun_events():
+    return get_metrics_registry().events(_session_id())
+
+
+def write_prometheus_file():
+    path = get_setting("metrics", "prometheus_file")
+    if not path:
+        return
+    # Written whole and swapped in, as the node_exporter textfile collector expects. Each writer gets
+    # its own temporary file, since every session's debug panel writes it.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(get_metrics_registry().prometheus_text())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,79 @@
+import glob
+import os
+import sqlalchemy
+import streamlit as st
+from utils.config import get_setting
+
+# --- Optional local columnar mirror of the report tables ---
+# The mirror is a directory of per-day Parquet files (written by utils/mirror_sync.py) queried
+# through an embedded DuckDB engine. Fact tables are partitioned by api_data_date, small
+# dimension tables are copied whole.
+
+FACT_TABLES = [
+    "bingads_optimizer_afs_campaign_performance_report",
+    "bingads_optimizer_afs_pub_report",
+]
+DIMENSION_TABLES = [
+    "bingads_user_campaign_permission_relation_master",
+    "bingads_account_master",
+    "users",
+]
+
+
+def mirror_enabled():
+    return get_setting("mirror", "enabled", False)
+
+
+def mirror_path():
+    return get_setting("mirror", "path", "mirror")
+
+
+def table_dir(table):
+    return os.path.join(mirror_path(), table)
+
+
+def _mirrored_tables():
+    # Every table directory holding Parquet files, including the rollups written by utils/rollups.py
+    root = mirror_path()
+    if not os.path.isdir(root):
+        return ()
+    return tuple(sorted(
+        name for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name)) and glob.glob(os.path.join(root, name, "*.parquet"))
+    ))
+
+
+def _create_views(dbapi_connection, connection_record):
+    tables = _mirrored_tables()
+    cursor = dbapi_connection.cursor()
+    for table in tables:
+        pattern = os.path.join(table_dir(table), "*.parquet").replace("'", "''")
+        cursor.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', union_by_name = true)")
+    cursor.close()
+    connection_record.info["mirror_tables"] = tables
+
+
+def _refresh_views(dbapi_connection, connection_record, connection_proxy):
+    # Tables that appeared after the connection was opened (e.g. a first rollup refresh) get their views on checkout
+    if connection_record.info.get("mirror_tables") != _mirrored_tables():
+        _create_views(dbapi_connection, connection_record)
+
+
+@st.cache_resource
+def get_mirror_engine():
+    # A queue pool rather than DuckDB's default per-thread pool, which closes connections still in use
+    # by the concurrent query workers; each connection is its own in-memory database with the views
+    engine = sqlalchemy.create_engine(
+        "duckdb:///:memory:",
+        poolclass=sqlalchemy.pool.QueuePool,
+        pool_size=get_setting("pool", "query_workers", 8),
+        max_overflow=4,
+    )
+    sqlalchemy.event.listen(engine, "connect", _create_views)
+    sqlalchemy.event.listen(engine, "checkout", _refresh_views)
+    return engine
+
+
+def to_mirror_sql(query):
+    # The queries are written for MySQL; DuckDB quotes identifiers with " instead of `
+    return query.replace("`", '"')
@@ -0,0 +1,111 @@
+import os
+from datetime import date, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import sqlalchemy
+from utils.config import get_setting
+from utils.db import get_engine
+from utils.mirror import FACT_TABLES, DIMENSION_TABLES, table_dir
+
+# --- Incremental sync of the local mirror from MySQL ---
+# Run on a schedule with `python -m utils.mirror_sync`. Each run re-pulls the last few days
+# (late-arriving rows) and every day after the newest one already mirrored.
+
+CHUNK_SIZE = 50000
+
+
+def _arrow_type(sql_type):
+    if isinstance(sql_type, sqlalchemy.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, sqlalchemy.Integer):
+        return pa.int64()
+    if isinstance(sql_type, sqlalchemy.Numeric):
+        if not sql_type.asdecimal or sql_type.precision is None:
+            return pa.float64()
+        decimal = pa.decimal128 if sql_type.precision <= 38 else pa.decimal256
+        return decimal(sql_type.precision, sql_type.scale or 0)
+    if isinstance(sql_type, sqlalchemy.DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, sqlalchemy.Date):
+        return pa.date32()
+    if isinstance(sql_type, sqlalchemy.LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+def table_schema(conn, table):
+    # Arrow schema from the table's declared column types, so every file of a table has the same
+    # schema whatever values (or NULLs) a day happens to hold
+    return pa.schema([(column["name"], _arrow_type(column["type"])) for column in sqlalchemy.inspect(conn).get_columns(table)])
+
+
+def _read_chunks(conn, query, params, schema):
+    for chunk in pd.read_sql(sqlalchemy.text(query), conn, params=params, chunksize=CHUNK_SIZE):
+        # A column the driver returned as all NULLs, Decimal objects or strings gets the table's type
+        yield pa.Table.from_pandas(chunk, preserve_index=False).cast(schema)
+
+
+def _write_parquet(batches, schema, target):
+    # A result with no rows still replaces the file (with an empty one), so rows deleted at the
+    # source don't stay in the mirror
+    tmp = f"{target}.tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for batch in batches:
+            writer.write(batch)
+            rows += batch.num_rows
+    # Readers only ever see complete files
+    os.replace(tmp, target)
+    return rows
+
+
+def _synced_days(table):
+    directory = table_dir(table)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(date.fromisoformat(name[:-len(".parquet")]) for name in os.listdir(directory) if name.endswith(".parquet"))
+
+
+def sync_fact_table(conn, table, today=None):
+    today = today or date.today()
+    resync_days = get_setting("mirror", "resync_days", 3)
+    initial_days = get_setting("mirror", "initial_days", 120)
+
+    synced = _synced_days(table)
+    if synced:
+        start = min(synced[-1] + timedelta(days=1), today - timedelta(days=resync_days - 1))
+    else:
+        start = today - timedelta(days=initial_days - 1)
+
+    os.makedirs(table_dir(table), exist_ok=True)
+    schema = table_schema(conn, table)
+    rows = 0
+    day = start
+    while day <= today:
+        target = os.path.join(table_dir(table), f"{day.isoformat()}.parquet")
+        chunks = _read_chunks(conn, f"SELECT * FROM {table} WHERE api_data_date = :day", {"day": day}, schema)
+        rows += _write_parquet(chunks, schema, target)
+        day += timedelta(days=1)
+    return start, rows
+
+
+def sync_dimension_table(conn, table):
+    os.makedirs(table_dir(table), exist_ok=True)
+    schema = table_schema(conn, table)
+    return _write_parquet(_read_chunks(conn, f"SELECT * FROM {table}", {}, schema), schema, os.path.join(table_dir(table), "full.parquet"))
+
+
+def sync_mirror():
+    engine = get_engine()
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for table in DIMENSION_TABLES:
+            rows = sync_dimension_table(conn, table)
+            print(f"{table}: {rows} rows")
+        for table in FACT_TABLES:
+            start, rows = sync_fact_table(conn, table)
+            print(f"{table}: {rows} rows since {start}")
+
+
+if __name__ == "__main__":
+    sync_mirror()
@@ -0,0 +1,102 @@
+import hashlib
+from datetime import timedelta
+import pandas as pd
+from utils.selection import selection_fingerprint
+from utils.metrics import timed
+from utils.cache import get_result_cache
+from utils.watermark import current_watermark, last_closed_day
+
+# --- Day-partitioned result cache ---
+# Results are stored per (query name, filter fingerprint, api_data_date), so widening or shifting
+# the date range only fetches the days that are not cached yet.
+
+
+def get_partition_store():
+    # Partitions share the byte-budgeted LRU with the other query results
+    return get_result_cache()
+
+
+def filter_fingerprint(*selections):
+    parts = [selection_fingerprint(selection) for selection in selections]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _is_open_day(day, watermark):
+    # Days near the latest loaded one may still receive rows; older days are final
+    return day > last_closed_day(watermark)
+
+
+def _partition_key(name, fingerprint, day, watermark):
+    # Open days are keyed on the watermark, so the next load makes them miss; closed days never
+    # expire and stay until the LRU evicts them
+    return (name, fingerprint, day, watermark.token if _is_open_day(day, watermark) else None)
+
+
+def _contiguous_ranges(days):
+    ranges = []
+    for day in days:
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def _lookup(store, name, fingerprint, days, watermark):
+    partitions = {}
+    missing = []
+    for day in days:
+        frame = store.get(_partition_key(name, fingerprint, day, watermark))
+        if frame is None:
+            missing.append(day)
+        else:
+            partitions[day] = frame
+    return partitions, missing
+
+
+def _stitch(partitions, days):
+    frames = [partitions[day] for day in days if day in partitions]
+    if not frames:
+        return pd.DataFrame()
+    non_empty = [frame for frame in frames if not frame.empty] or frames[:1]
+    return pd.concat(non_empty, ignore_index=True)
+
+
+def _days(start_date, end_date):
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def peek_partitioned(name, fingerprint, start_date, end_date, report="campaign"):
+    # Returns the stitched range only if every day is already cached, without querying
+    days = _days(start_date, end_date)
+    partitions, missing = _lookup(get_partition_store(), name, fingerprint, days, current_watermark(report))
+    if missing:
+        return None
+    return _stitch(partitions, days)
+
+
+def fetch_partitioned(name, fingerprint, start_date, end_date, fetch_range, report="campaign", date_column="Date"):
+    # `report` names the report table the query reads, whose watermark decides when open days refresh
+    with timed("partitions", name) as stats:
+        store = get_partition_store()
+        watermark = current_watermark(report)
+        days = _days(start_date, end_date)
+        partitions, missing = _lookup(store, name, fingerprint, days, watermark)
+        stats.update(cache="miss" if missing else "hit", hit_days=len(partitions), missed_days=len(missing))
+
+        for range_start, range_end in _contiguous_ranges(missing):
+            df = fetch_range(range_start, range_end)
+            if df is None or df.columns.empty:
+                # Failed query: serve what we have and retry these days on the next rerun
+                continue
+            by_day = dict(tuple(df.groupby(pd.to_datetime(df[date_column]).dt.date))) if not df.empty else {}
+            day = range_start
+            while day <= range_end:
+                frame = by_day.get(day, df.iloc[0:0])
+                store.put(_partition_key(name, fingerprint, day, watermark), frame)
+                partitions[day] = frame
+                day += timedelta(days=1)
+
+        stitched = _stitch(partitions, days)
+        stats["rows"] = len(stitched)
+        return stitched
@@ -0,0 +1,62 @@
+from utils.rollups import route_rollup
+
+# --- Shared WHERE-clause builder for the report queries ---
+# The user filter is a semi-join against the permission table: omitted entirely when no users are
+# selected, and an EXISTS (rather than a JOIN) when they are, so a campaign shared by several users
+# is never counted more than once.
+
+PERMISSION_TABLE = "bingads_user_campaign_permission_relation_master"
+
+# Column names of each report table, with the alias the queries use for it
+REPORT_TABLES = {
+    "campaign": {
+        "table": "bingads_optimizer_afs_campaign_performance_report",
+        "alias": "bop",
+        "account": "bing_account_id",
+        "campaign_id": "bing_campaign_id",
+        "campaign_name": "bing_campaign_name",
+    },
+    "publisher": {
+        "table": "bingads_optimizer_afs_pub_report",
+        "alias": "a",
+        "account": "account_id",
+        "campaign_id": "campaign_id",
+        "campaign_name": "campaign_name",
+    },
+}
+
+
+def report_where(report, start_date, end_date, user_ids=None, campaign_names=None, account_ids=None):
+    spec = REPORT_TABLES[report]
+    alias = spec["alias"]
+
+    conditions = [f"{alias}.api_data_date BETWEEN :start_date AND :end_date"]
+    params = {"start_date": start_date, "end_date": end_date}
+    if account_ids:
+        conditions.append(f"{alias}.{spec['account']} IN :account_ids")
+        params["account_ids"] = list(account_ids)
+    if user_ids:
+        conditions.append(
+            f"EXISTS (SELECT 1 FROM {PERMISSION_TABLE} bu "
+            f"WHERE bu.campaign_id = {alias}.{spec['campaign_id']} AND bu.user_id IN :user_ids)"
+        )
+        params["user_ids"] = list(user_ids)
+    if campaign_names:
+        conditions.append(f"{alias}.{spec['campaign_name']} IN :campaign_names")
+        params["campaign_names"] = list(campaign_names)
+
+    return " AND ".join(conditions), params
+
+
+def report_table(report, start_date, end_date, grain=(), user_ids=None, campaign_names=None, account_ids=None):
+    # The table to read from: the coarsest rollup (utils/rollups.py) keeping every dimension the query
+    # groups or filters by and covering start_date..end_date, or the raw report table. `grain` lists
+    # the dimensions it groups by.
+    needs = set(grain)
+    if account_ids:
+        needs.add("account")
+    if user_ids:
+        needs.add("campaign_id")
+    if campaign_names:
+        needs.add("campaign_name")
+    return route_rollup(report, needs, start_date, end_date) or REPORT_TABLES[report]["table"]
@@ -0,0 +1,231 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+import pandas as pd
+import sqlalchemy
+from utils.config import get_setting
+from utils.db import get_engine, _compile
+from utils.mirror import mirror_enabled, get_mirror_engine, table_dir
+from utils.mirror_sync import CHUNK_SIZE, _write_parquet, _synced_days
+from utils.cache import get_result_cache
+
+# --- Pre-aggregated rollups of the report tables ---
+# Each rollup keeps its source table's column names, with the measures summed over its grain, so a
+# query routed to one only swaps the table name. Rollups live wherever the report queries run: as
+# tables in MySQL, or as per-day Parquet tables in the local mirror. Refresh them on a schedule with
+# `python -m utils.rollups` (pass a number of days to rebuild a longer window).
+
+# One row per refresh, so the freshness watermark (utils/watermark.py) sees rollup refreshes and the
+# router knows the last closed day the rollups were rebuilt through
+ROLLUP_STATE_TABLE = "dash_rollup_state"
+
+CAMPAIGN_SUMS = ["bing_impressions", "bing_clicks", "pbt_adclick_count", "bing_spend", "tcl_revenue", "afs_estimated_earnings"]
+
+# Listed coarsest first; `grain` names the filter/group-by dimensions a rollup keeps besides the date
+ROLLUPS = [
+    {
+        "table": "dash_rollup_date_account",
+        "report": "campaign",
+        "source": "bingads_optimizer_afs_campaign_performance_report",
+        "grain": {"account"},
+        "dimensions": ["api_data_date", "bing_account_id"],
+        "sums": CAMPAIGN_SUMS,
+        "maxes": [],
+    },
+    {
+        "table": "dash_rollup_date_campaign",
+        "report": "campaign",
+        "source": "bingads_optimizer_afs_campaign_performance_report",
+        "grain": {"account", "campaign_id", "campaign_name"},
+        "dimensions": ["api_data_date", "bing_account_id", "bing_campaign_id", "bing_campaign_name"],
+        "sums": CAMPAIGN_SUMS,
+        "maxes": [],
+    },
+    {
+        # Ad groups are folded away; their name and blocked flags keep one representative value
+        "table": "dash_rollup_date_publisher",
+        "report": "publisher",
+        "source": "bingads_optimizer_afs_pub_report",
+        "grain": {"account", "campaign_id", "campaign_name", "publisher"},
+        "dimensions": ["api_data_date", "account_id", "campaign_id", "campaign_name", "final_main_domain"],
+        "sums": ["bing_impression", "pbt_adclick_count", "bing_spend", "tcl_revenue"],
+        "maxes": ["ad_group_name", "blocked_at_ad_group", "blocked_at_campaign"],
+    },
+]
+
+
+def rollups_enabled():
+    return get_setting("rollups", "enabled", False)
+
+
+def _rollup_engine():
+    return get_mirror_engine() if mirror_enabled() else get_engine()
+
+
+def _first_day(table):
+    try:
+        with _rollup_engine().connect() as conn:
+            return conn.execute(sqlalchemy.text(f"SELECT MIN(api_data_date) FROM {table}")).scalar()
+    except Exception:
+        # Not built yet
+        return None
+
+
+def refreshed_at():
+    # When the rollups were last refreshed, or None if they never were
+    try:
+        with _rollup_engine().connect() as conn:
+            return conn.execute(sqlalchemy.text(f"SELECT MAX(refreshed_at) FROM {ROLLUP_STATE_TABLE}")).scalar()
+    except Exception:
+        return None
+
+
+def _refreshed_through():
+    # The last closed day (no more rows will land) when the latest refresh ran; later days in the
+    # rollups may be missing rows loaded since
+    try:
+        with _rollup_engine().connect() as conn:
+            return conn.execute(sqlalchemy.text(f"SELECT MAX(refreshed_through) FROM {ROLLUP_STATE_TABLE}")).scalar()
+    except Exception:
+        return None
+
+
+def _as_date(value):
+    return date.fromisoformat(str(value)[:10])
+
+
+def _rollup_span(table):
+    # (first day, last refreshed day) of a rollup, or None until a refresh has built it. Re-read on the
+    # watermark's interval; a missing rollup isn't cached, so it is used as soon as it has been built.
+    cache = get_result_cache()
+    key = ("rollup_span", table)
+    span = cache.get(key, get_setting("cache", "watermark_interval", 60))
+    if span is None:
+        first_day, through = _first_day(table), _refreshed_through()
+        if first_day is None or through is None:
+            return None
+        span = (_as_date(first_day), _as_date(through))
+        cache.put(key, span)
+    return span
+
+
+# --- Router ---
+
+def _with_open_days(rollup, through):
+    # The rollup's final days, plus the days after `through` aggregated from the report table at the
+    # rollup's grain, so rows loaded since the refresh are included. `through` is a date, not user input.
+    columns = ", ".join(rollup["dimensions"] + rollup["sums"] + rollup["maxes"])
+    day = through.isoformat()
+    open_days = _rollup_select(rollup, f"api_data_date > '{day}'")
+    return f"(SELECT {columns} FROM {rollup['table']} WHERE api_data_date <= '{day}' UNION ALL {open_days})"
+
+
+def route_rollup(report, needs, start_date, end_date):
+    # The coarsest rollup that keeps every dimension the query needs and holds its start date. Ranges
+    # reaching past the last closed day at refresh time read those days from the report table.
+    if not rollups_enabled():
+        return None
+    for rollup in ROLLUPS:
+        if rollup["report"] != report or not needs <= rollup["grain"]:
+            continue
+        span = _rollup_span(rollup["table"])
+        if span is None or start_date < span[0]:
+            continue
+        through = span[1]
+        return rollup["table"] if end_date <= through else _with_open_days(rollup, through)
+    return None
+
+
+# --- Refresh job ---
+
+def _rollup_select(rollup, where):
+    dimensions = ", ".join(rollup["dimensions"])
+    measures = [f"SUM({col}) AS {col}" for col in rollup["sums"]]
+    measures += [f"MAX({col}) AS {col}" for col in rollup["maxes"]]
+    return f"SELECT {dimensions}, {', '.join(measures)} FROM {rollup['source']} WHERE {where} GROUP BY {dimensions}"
+
+
+def _refresh_mysql(rollup, start, end):
+    table = rollup["table"]
+    columns = ", ".join(rollup["dimensions"] + rollup["sums"] + rollup["maxes"])
+    select = _rollup_select(rollup, "api_data_date BETWEEN :start_date AND :end_date")
+    params = {"start_date": start, "end_date": end}
+
+    engine = get_engine()
+    # DDL commits implicitly in MySQL, so the table is created outside the refresh transaction
+    with engine.connect() as conn:
+        conn.execute(sqlalchemy.text(
+            f"CREATE TABLE IF NOT EXISTS {table} (INDEX (api_data_date)) {_rollup_select(rollup, '1 = 0')}"
+        ))
+    # Readers see either the old or the new rows for the window, never a half-written day
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text(f"DELETE FROM {table} WHERE api_data_date BETWEEN :start_date AND :end_date"), params)
+        return conn.execute(sqlalchemy.text(f"INSERT INTO {table} ({columns}) {select}"), params).rowcount
+
+
+def _refresh_mirror(rollup, start, end):
+    os.makedirs(table_dir(rollup["table"]), exist_ok=True)
+    select = _rollup_select(rollup, "api_data_date = :day")
+    engine = get_mirror_engine()
+    rows = 0
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        day = start
+        while day <= end:
+            target = os.path.join(table_dir(rollup["table"]), f"{day.isoformat()}.parquet")
+            # DuckDB types the result from the mirrored columns, not the values, so every day gets the same schema
+            cursor.execute(*_compile(select, {"day": day}, engine.dialect))
+            batches = cursor.fetch_record_batch(CHUNK_SIZE)
+            rows += _write_parquet(batches, batches.schema, target)
+            day += timedelta(days=1)
+    finally:
+        connection.close()
+    return rows
+
+
+def _refresh_start(rollup, today, days):
+    if days is not None:
+        return today - timedelta(days=days - 1)
+    if mirror_enabled():
+        built = bool(_synced_days(rollup["table"]))
+    else:
+        built = _first_day(rollup["table"]) is not None
+    # Recent days are still being loaded, so they are rebuilt on every run; a new rollup is backfilled
+    days = get_setting("rollups", "refresh_days", 3) if built else get_setting("rollups", "initial_days", 120)
+    return today - timedelta(days=days - 1)
+
+
+def _record_refresh(through):
+    now = datetime.now().replace(microsecond=0)
+    if mirror_enabled():
+        os.makedirs(table_dir(ROLLUP_STATE_TABLE), exist_ok=True)
+        target = os.path.join(table_dir(ROLLUP_STATE_TABLE), "full.parquet")
+        pd.DataFrame({"refreshed_at": [now], "refreshed_through": [through]}).to_parquet(f"{target}.tmp", index=False)
+        os.replace(f"{target}.tmp", target)
+        return
+    with get_engine().begin() as conn:
+        conn.execute(sqlalchemy.text(
+            f"CREATE TABLE IF NOT EXISTS {ROLLUP_STATE_TABLE} (refreshed_at DATETIME NOT NULL, refreshed_through DATE NOT NULL)"
+        ))
+        conn.execute(sqlalchemy.text(
+            f"INSERT INTO {ROLLUP_STATE_TABLE} (refreshed_at, refreshed_through) VALUES (:now, :through)"
+        ), {"now": now, "through": through})
+
+
+def refresh_rollups(days=None, today=None):
+    today = today or date.today()
+    refresh = _refresh_mirror if mirror_enabled() else _refresh_mysql
+    for rollup in ROLLUPS:
+        start = _refresh_start(rollup, today, days)
+        rows = refresh(rollup, start, today)
+        print(f"{rollup['table']}: {rows} rows since {start}")
+    # Days after the last closed one still receive rows, so the rollups only vouch for days up to it.
+    # Imported here: utils.watermark reads the refresh time from this module.
+    from utils.watermark import current_watermark, last_closed_day
+    through = min([today] + [last_closed_day(current_watermark(report)) for report in {rollup["report"] for rollup in ROLLUPS}])
+    _record_refresh(through)
+
+
+if __name__ == "__main__":
+    refresh_rollups(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,48 @@
+import hashlib
+
+# --- Sidebar filter selections ---
+# "Select All" is carried as a sentinel rather than the full list, so queries drop the predicate
+# entirely; explicit selections carry a short stable fingerprint that is used as the cache key.
+
+
+class Selection:
+    __slots__ = ('values', 'is_all', 'fingerprint')
+
+    def __init__(self, values=(), is_all=False):
+        self.values = () if is_all else tuple(values)
+        self.is_all = is_all
+        if is_all or not self.values:
+            self.fingerprint = '*'
+        else:
+            joined = '\x1f'.join(sorted(map(str, self.values)))
+            self.fingerprint = hashlib.sha1(joined.encode()).hexdigest()[:16]
+
+    @classmethod
+    def all(cls):
+        return cls(is_all=True)
+
+    # Falsy when no predicate is needed: everything selected, or nothing explicitly selected
+    def __bool__(self):
+        return bool(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __eq__(self, other):
+        return isinstance(other, Selection) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __repr__(self):
+        return 'Selection.all()' if self.is_all else f'Selection({len(self.values)} values, {self.fingerprint})'
+
+
+
+def selection_fingerprint(selection):
+    if isinstance(selection, Selection):
+        return selection.fingerprint
+    return Selection(selection or ()).fingerprint
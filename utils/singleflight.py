@@ -0,0 +1,56 @@
+import threading
+import streamlit as st
+
+# --- Single-flight: identical concurrent calls share one execution ---
+# The first caller for a key runs the function; callers arriving with the same key while it is
+# still running wait for it and get the same result (or the same exception). Nothing is kept
+# once the call returns, so this only coalesces overlapping calls; caching is up to the caller.
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        # Returns (result, shared): shared is True for callers that waited on another's execution
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+@st.cache_resource
+def get_query_flights():
+    return SingleFlight()
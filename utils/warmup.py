@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date
+import streamlit as st
+from queries.dashboard import QUICK_RANGES, quick_range, dashboard_tasks
+from queries.campaign_dimension import get_campaign_dimension
+from utils.config import get_setting
+from utils.metrics import record_event
+from utils.selection import Selection, selection_fingerprint
+from utils.watermark import current_watermark
+
+# --- Background cache warm-up ---
+# A daemon thread, started with the first session, fills the result cache for every quick-filter
+# range: for the default all-accounts/all-users/all-campaigns view and for the filter selections
+# used most often. It runs again whenever a new load lands (the watermark moves), the day rolls
+# over or the most used selections change, so those views are served from cache.
+
+_log = logging.getLogger(__name__)
+
+# Distinct selections remembered before the rarely used ones are dropped
+_MAX_TRACKED = 1000
+
+
+def warmup_enabled():
+    return get_setting("warmup", "enabled", False)
+
+
+class WarmupScheduler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uses = Counter()
+        self._filters = {}
+        self._warmed_state = None
+        self.last_warmup = None
+        self._thread = threading.Thread(target=self._run, name="cache-warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def note(self, filters):
+        # Counts a page view's (users, campaigns, accounts) selection; the default view is always warmed
+        key = tuple(selection_fingerprint(selection) for selection in filters)
+        if all(fingerprint == '*' for fingerprint in key):
+            return
+        with self._lock:
+            self._uses[key] += 1
+            self._filters[key] = filters
+            if len(self._uses) > _MAX_TRACKED:
+                self._uses = Counter(dict(self._uses.most_common(_MAX_TRACKED // 10)))
+                self._filters = {key: self._filters[key] for key in self._uses}
+
+    def _targets(self):
+        with self._lock:
+            top = [key for key, _ in self._uses.most_common(get_setting("warmup", "top_selections", 5))]
+            return [(Selection.all(), Selection.all(), Selection.all())] + [self._filters[key] for key in top]
+
+    def _state(self, targets):
+        tokens = tuple(current_watermark(report).token for report in ("campaign", "publisher"))
+        return date.today(), tokens, tuple(tuple(selection_fingerprint(s) for s in filters) for filters in targets)
+
+    def _run(self):
+        while True:
+            try:
+                targets = self._targets()
+                state = self._state(targets)
+                if state != self._warmed_state:
+                    self.warm(targets)
+                    self._warmed_state = state
+            except Exception:
+                _log.exception("Cache warm-up failed")
+            time.sleep(get_setting("warmup", "interval", 60))
+
+    def warm(self, targets):
+        # Views already cached are hits, so a re-run only pays for what the load or day changed
+        started = time.perf_counter()
+        today = date.today()
+        get_campaign_dimension()
+        for filters in targets:
+            for days in QUICK_RANGES.values():
+                start_date, end_date = quick_range(days, today)
+                for fn, args in dashboard_tasks(start_date, end_date, filters).values():
+                    fn(*args)
+        seconds = time.perf_counter() - started
+        self.last_warmup = {"at": time.time(), "seconds": seconds, "selections": len(targets)}
+        record_event("warmup", "warm", seconds, ranges=len(QUICK_RANGES), selections=len(targets))
+
+
+@st.cache_resource
+def get_warmup_scheduler():
+    scheduler = WarmupScheduler()
+    scheduler.start()
+    return scheduler
+
+
+def start_warmup():
+    # Streamlit has no server-start hook, so the first page load starts the (single) scheduler
+    if warmup_enabled():
+        get_warmup_scheduler()
+
+
+def note_selection(filters):
+    if warmup_enabled():
+        get_warmup_scheduler().note(filters)
@@ -0,0 +1,76 @@
+import time
+from datetime import date, timedelta
+from utils.config import get_setting
+from utils.cache import get_result_cache
+from utils.db import run_query
+from utils.query_builder import REPORT_TABLES
+from utils.rollups import rollups_enabled, refreshed_at
+
+# --- Freshness watermark of the report tables ---
+# A cheap probe over the last few days (latest api_data_date, row count and, if configured, the
+# newest load timestamp, plus the last rollup refresh when rollups are on) identifies the loaded
+# state of a report table. Cached results that can
+# still change are keyed on it, so they are refreshed as soon as a load lands and not before.
+
+
+class Watermark:
+    __slots__ = ('latest_date', 'token')
+
+    def __init__(self, latest_date, token):
+        self.latest_date = latest_date
+        self.token = token
+
+    def __repr__(self):
+        return f'Watermark({self.latest_date}, {self.token})'
+
+
+def _lookback_start():
+    return date.today() - timedelta(days=get_setting("cache", "open_days", 2) + 1)
+
+
+def _probe(report):
+    cache = get_result_cache()
+    key = ("watermark", report)
+    df = cache.get(key, get_setting("cache", "watermark_interval", 60))
+    if df is not None:
+        return df
+
+    spec = REPORT_TABLES[report]
+    load_column = get_setting("cache", "load_timestamp_column")
+    loaded_at = f", MAX({load_column}) AS loaded_at" if load_column else ""
+    # Only recent days are scanned; on an index over api_data_date this is a short range read
+    query = f"""
+        SELECT MAX(api_data_date) AS latest_date, COUNT(*) AS recent_rows{loaded_at}
+        FROM {spec['table']}
+        WHERE api_data_date >= :since
+    """
+    df = run_query(query, {"since": _lookback_start()}, source="reports")
+    if not df.empty and rollups_enabled():
+        # Routed queries read the rollups, which change when they are refreshed rather than on load
+        df = df.assign(rollups_refreshed_at=refreshed_at())
+    if not df.empty:
+        cache.put(key, df)
+    return df
+
+
+def current_watermark(report):
+    df = _probe(report)
+    if df.empty:
+        # Probe failed: fall back to expiring open days on a fixed interval
+        return Watermark(None, ("interval", int(time.time() // get_setting("cache", "open_day_ttl", 900))))
+    row = df.iloc[0]
+    latest = row['latest_date']
+    latest_date = None if latest is None or latest != latest else date.fromisoformat(str(latest)[:10])
+    token = tuple(str(value) for value in row.tolist())
+    return Watermark(latest_date, token)
+
+
+def last_closed_day(watermark):
+    # Days after this one may still receive rows; it and every day before it are final
+    latest = watermark.latest_date or date.today()
+    return latest - timedelta(days=get_setting("cache", "open_days", 2))
+
+
+def data_version(report):
+    # For @cached(version=...): results keyed on the report table's current watermark
+    return lambda: current_watermark(report).token